@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the Binance klines to DataFrame conversion
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+
+Usage: python benchmarks/bench_frames.py [--rows 10000 1000000 ...] [--repeat 3]
+"""
+import os, sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ts.crossover import BINANCE_COLUMNS, binanceData2DataFrame
+from ts.replay import ReplayClient
+
+def binanceData2DataFrame_legacy(klines_list:list) -> pd.DataFrame:
+    """The previous row oriented implementation, kept as the reference"""
+    df = pd.DataFrame(klines_list, columns=BINANCE_COLUMNS)
+    date_columns = ["open_time", "close_time"]
+    for c in date_columns:
+        df[c] = pd.to_datetime(df[c]/1000, unit="s")
+    numeric_columns = [c for c  in BINANCE_COLUMNS if c not in date_columns]
+    df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric)
+    df.set_index('open_time', inplace=True)
+    return df
+
+def timeit(function, repeat:int) -> float:
+    """Best wall time of the repetitions"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv:list=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("@")[0].strip())
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    print("{:>10} {:>12} {:>12} {:>12} {:>8} {:>10} {:>10}".format(
+        "rows", "legacy (s)", "vector (s)", "compact (s)", "speedup", "MB", "compact MB"))
+    for rows in args.rows:
+        klines = ReplayClient(rows=rows).klines("BTCUSDT", "1m", 0, rows)
+        legacy, vector = binanceData2DataFrame_legacy(klines), binanceData2DataFrame(klines)
+        compact = binanceData2DataFrame(klines, compact=True)
+        # same values, the legacy float rounding of the dates can shift them by one microsecond
+        assert (vector.index == pd.to_datetime([k[0] for k in klines], unit="ms")).all()
+        assert np.allclose(legacy["close"].to_numpy(), vector["close"].to_numpy())
+        t_legacy = timeit(lambda: binanceData2DataFrame_legacy(klines), args.repeat)
+        t_vector = timeit(lambda: binanceData2DataFrame(klines), args.repeat)
+        t_compact = timeit(lambda: binanceData2DataFrame(klines, compact=True), args.repeat)
+        print("{:>10,} {:>12.4f} {:>12.4f} {:>12.4f} {:>7.1f}x {:>10.1f} {:>10.1f}".format(
+            rows, t_legacy, t_vector, t_compact, t_legacy/t_vector,
+            vector.memory_usage(deep=True).sum()/2**20, compact.memory_usage(deep=True).sum()/2**20))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
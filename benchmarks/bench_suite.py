@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmarks of the sync, DB and frame paths over the offline ReplayClient
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+
+Every benchmark processes the rows in chunks so the 10M rows runs keep a constant memory,
+only the benchmarked calls are timed. The results (rows/sec) are compared against the
+stored baseline (benchmarks/baseline.json), save a new one with --save-baseline.
+
+Usage: python benchmarks/bench_suite.py [--sizes 10000 1000000 10000000] [--only sync_data ...]
+"""
+import os, sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ts.exchangers import Exchange
+from ts.db import Connection
+from ts.crossover import binanceData2DataFrame
+from ts.replay import ReplayClient
+from ts.utils import timestamp2datetime, timestamps2datetime, print_okgreen, print_fail, print_bold
+
+BASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+CHUNK_SIZE = 100000
+SYMBOL, CURRENCY, INTERVAL = "BTCUSDT", "BTC", "1m"
+
+def replay_chunks(client:ReplayClient, rows:int):
+    """Synthetic klines of the benchmark pair in chunks"""
+    for first in range(0, rows, CHUNK_SIZE):
+        yield client.klines(SYMBOL, INTERVAL, first, min(rows, first + CHUNK_SIZE))
+
+def new_exchange(work_dir:str, rows:int) -> Exchange:
+    """Exchange over the ReplayClient with a fresh DB and a single currency"""
+    exchange = Exchange(None, None, base_path=BASE_PATH, db_file=os.path.join(work_dir, "bench.db"),
+        client=ReplayClient(rows=rows))
+    exchange.CURRENCIES = {CURRENCY: "Bitcoin"}
+    return exchange
+
+def bench_sync_data(work_dir:str, rows:int) -> float:
+    """Exchange.sync_data of a pair from an empty DB (includes the replay client page building)"""
+    exchange = new_exchange(work_dir, rows)
+    start = time.perf_counter()
+    exchange.sync_data([INTERVAL])
+    return time.perf_counter() - start
+
+def bench_insert_klines(work_dir:str, rows:int) -> float:
+    """Connection.insert_klines in batches of the page size"""
+    exchange = new_exchange(work_dir, rows)
+    currency_interval = exchange.get_or_create_currency_interval(
+        exchange.get_or_create_currency(CURRENCY, "Bitcoin"), INTERVAL)
+    elapsed = 0.0
+    for klines in replay_chunks(exchange.client, rows):
+        pages = [[exchange.kline2row(k) for k in klines[i:i + 1000]] for i in range(0, len(klines), 1000)]
+        start = time.perf_counter()
+        for page in pages:
+            exchange.store_kline_rows(currency_interval, page)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+def bench_read_kline_arrays(work_dir:str, rows:int) -> float:
+    """Connection.iter_kline_arrays over the pair stored by the insert benchmark"""
+    db_conn = Connection(work_dir, os.path.join(work_dir, "bench.db"))
+    start = time.perf_counter()
+    total = sum(len(chunk["open_time"]) for chunk in db_conn.iter_kline_arrays(CURRENCY, INTERVAL))
+    elapsed = time.perf_counter() - start
+    assert total == rows, "expected {} rows, read {}".format(rows, total)
+    return elapsed
+
+def bench_execute_query_fetch(work_dir:str, rows:int) -> float:
+    """Connection.execute_query_fetch of the whole pair (sqlite3.Row list)"""
+    db_conn = Connection(work_dir, os.path.join(work_dir, "bench.db"))
+    start = time.perf_counter()
+    total = len(db_conn.execute_query_fetch("klines", condition_dict={"interval_name":INTERVAL}))
+    elapsed = time.perf_counter() - start
+    assert total == rows, "expected {} rows, read {}".format(rows, total)
+    return elapsed
+
+def bench_binanceData2DataFrame(work_dir:str, rows:int) -> float:
+    """crossover.binanceData2DataFrame by chunk"""
+    elapsed = 0.0
+    for klines in replay_chunks(ReplayClient(rows=rows), rows):
+        start = time.perf_counter()
+        binanceData2DataFrame(klines)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+def bench_timestamp2datetime(work_dir:str, rows:int) -> float:
+    """utils.timestamp2datetime called on each open time"""
+    elapsed = 0.0
+    for klines in replay_chunks(ReplayClient(rows=rows), rows):
+        open_times = [k[0] for k in klines]
+        start = time.perf_counter()
+        for t in open_times:
+            timestamp2datetime(t)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+def bench_timestamps2datetime(work_dir:str, rows:int) -> float:
+    """utils.timestamps2datetime of the open times by chunk, to a tz-aware DatetimeIndex"""
+    elapsed = 0.0
+    for klines in replay_chunks(ReplayClient(rows=rows), rows):
+        open_times = [k[0] for k in klines]
+        start = time.perf_counter()
+        timestamps2datetime(open_times, tz="America/Hermosillo")
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+# in order, the read benchmarks use the DB of the insert benchmark
+BENCHMARKS = {
+    "sync_data": bench_sync_data,
+    "insert_klines": bench_insert_klines,
+    "read_kline_arrays": bench_read_kline_arrays,
+    "execute_query_fetch": bench_execute_query_fetch,
+    "binanceData2DataFrame": bench_binanceData2DataFrame,
+    "timestamp2datetime": bench_timestamp2datetime,
+    "timestamps2datetime": bench_timestamps2datetime,
+}
+
+def run(sizes:list, only:list=None) -> dict:
+    """Run the benchmarks
+    :return: dictionary of rows/sec by 'benchmark:rows'
+    """
+    results = {}
+    for rows in sizes:
+        work_dir = tempfile.mkdtemp(prefix="ts-bench-")
+        try:
+            for name, bench in BENCHMARKS.items():
+                if only and name not in only:
+                    continue
+                db_file = os.path.join(work_dir, "bench.db")
+                if name in ["sync_data", "insert_klines"] and os.path.exists(db_file):
+                    os.remove(db_file)
+                elapsed = bench(work_dir, rows)
+                results["{}:{}".format(name, rows)] = rows/elapsed if elapsed > 0 else float("inf")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def compare(results:dict, baseline:dict, tolerance:float) -> int:
+    """Print the results against the baseline
+    :return: number of regressions, slower than the baseline by more than the tolerance
+    """
+    regressions = 0
+    print_bold("{:<40} {:>14} {:>14} {:>8}".format("benchmark:rows", "rows/sec", "baseline", "ratio"))
+    for key, rate in results.items():
+        base = baseline.get(key)
+        line = "{:<40} {:>14,.0f} {:>14} {:>8}".format(key, rate, "{:,.0f}".format(base) if base else "-",
+            "{:.2f}x".format(rate/base) if base else "-")
+        if base and rate < base*(1 - tolerance):
+            regressions += 1
+            print_fail(line)
+        else:
+            print(line)
+    return regressions
+
+def main(argv:list=None) -> int:
+    parser = argparse.ArgumentParser(description="Throughput benchmarks of the sync, DB and frame paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000, 10000000])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS.keys()))
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown fraction")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args(argv)
+    results = run(args.sizes, args.only)
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance)
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print_okgreen("Baseline saved to {}".format(args.baseline))
+        return 0
+    return 1 if regressions > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Connection metadata cache tests with the concurrent reads mode
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from ts.db import Connection
+from ts.exchangers import Exchange
+from ts.replay import ReplayClient
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class ConcurrentReadsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp_dir.name, "data.db")
+        self.exchange = Exchange(ReplayClient.API_KEY, ReplayClient.API_SECRET, base_path=BASE_PATH,
+            db_file=self.db_file, client=ReplayClient(rows=2000), concurrent_reads=True)
+        self.exchange.CURRENCIES = {"BTC": "Bitcoin"}
+        self.exchange.sync_data(["1m"])
+        self.db_conn = self.exchange.db_conn
+
+    def tearDown(self) -> None:
+        self.db_conn.read_pool.close()
+        self.db_conn.db_conn.close()
+        self.tmp_dir.cleanup()
+
+    def test_reader_threads(self) -> None:
+        cache = self.db_conn.metadata_cache
+        self.db_conn.read_klines("BTC", "1m")
+        hits = cache.hits
+        self.db_conn.read_klines("BTC", "1m")
+        read_hits, stats = cache.hits - hits, cache.stats()
+        self.assertGreater(read_hits, 0)
+        with self.assertNoLogs("ts.db", level="ERROR"):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                frames = list(pool.map(lambda _: self.db_conn.read_klines("BTC", "1m"), range(8)))
+        self.assertEqual([len(f) for f in frames], [2000]*8)
+        # the reader threads leave the cache of the writer thread alone
+        self.assertEqual(cache.stats(), stats)
+        self.db_conn.read_klines("BTC", "1m")
+        self.assertEqual(cache.hits, stats["hits"] + read_hits)
+
+    def test_commits_of_other_connections(self) -> None:
+        currency = self.db_conn.get_currency("BTC")
+        before = self.db_conn.get_currency_interval(currency["id"], "1m")["last_transaction_date"]
+        other = Connection(BASE_PATH, self.db_file)
+        other.db_conn.execute("UPDATE currency_interval SET last_transaction_date = last_transaction_date + 60;")
+        other.db_conn.commit()
+        other.db_conn.close()
+        self.assertEqual(self.db_conn.get_currency_interval(currency["id"], "1m")["last_transaction_date"], before + 60)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Classical decomposition tests against statsmodels.tsa.seasonal.seasonal_decompose,
+statsmodels is a test requirement (pip install -r requirements-dev.txt)
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import unittest
+import numpy as np
+from ts.decomposition import DECOMPOSITION_MODELS, IncrementalDecomposition, seasonal_decompose_batch
+
+try:
+    from statsmodels.tsa.seasonal import seasonal_decompose
+except ImportError:
+    seasonal_decompose = None
+
+PERIODS = [7, 12, 24]
+
+def seasonal_series(count:int, length:int, period:int, seed:int=0) -> np.ndarray:
+    """Positive random walks plus a season and noise, valid for both models"""
+    rng = np.random.default_rng(seed)
+    return 50 + np.cumsum(rng.normal(size=(count, length)), axis=1)*0.1 \
+        + 3*np.sin(np.arange(length)*2*np.pi/period) + 0.2*rng.normal(size=(count, length))
+
+@unittest.skipIf(seasonal_decompose is None, "statsmodels is not installed, see requirements-dev.txt")
+class SeasonalDecomposeTest(unittest.TestCase):
+    def test_batch(self) -> None:
+        for period in PERIODS:
+            for model in DECOMPOSITION_MODELS:
+                with self.subTest(period=period, model=model):
+                    values = seasonal_series(4, 10*period + 3, period)
+                    result = seasonal_decompose_batch(values, period, model)
+                    for i, series in enumerate(values):
+                        expected = seasonal_decompose(series, model=model, period=period)
+                        for component in ["trend", "seasonal", "resid"]:
+                            np.testing.assert_allclose(result[component][i], np.asarray(getattr(expected, component)),
+                                err_msg=component)
+
+    def test_incremental(self) -> None:
+        for period in PERIODS:
+            for model in DECOMPOSITION_MODELS:
+                with self.subTest(period=period, model=model):
+                    series = seasonal_series(1, 10*period + 3, period, seed=1)[0]
+                    expected = seasonal_decompose(series, model=model, period=period)
+                    decomposition = IncrementalDecomposition(period, model)
+                    results = decomposition.warm_up(series)
+                    positions = np.array([r[0] for r in results])
+                    np.testing.assert_allclose([r[2] for r in results], np.asarray(expected.trend)[positions])
+                    np.testing.assert_allclose(decomposition.seasonal_indices(), np.asarray(expected.seasonal)[:period])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent sync scheduler tests over the offline ReplayClient
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import os
+import signal
+import tempfile
+import unittest
+from ts.exchangers import Exchange
+from ts.replay import ReplayClient
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class SyncSchedulerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.exchange = Exchange(ReplayClient.API_KEY, ReplayClient.API_SECRET, base_path=BASE_PATH,
+            db_file=os.path.join(self.tmp_dir.name, "data.db"), client=ReplayClient(rows=5000))
+        self.exchange.CURRENCIES = {"BTC": "Bitcoin", "ETH": "Ethereum"}
+
+    def tearDown(self) -> None:
+        self.exchange.db_conn.db_conn.close()
+        self.tmp_dir.cleanup()
+
+    def sync(self, **kwargs) -> dict:
+        """sync_data with an alarm, a scheduler that never ends fails the test instead of hanging it"""
+        def timeout(signum, frame):
+            raise TimeoutError("sync_data did not finish")
+        previous = signal.signal(signal.SIGALRM, timeout)
+        signal.alarm(30)
+        try:
+            return self.exchange.sync_data(["1m"], **kwargs)
+        finally:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous)
+
+    def test_concurrent_sync(self) -> None:
+        summary = self.sync(workers=2)
+        self.assertEqual({k:v["status"] for k, v in summary.items()}, {("BTC", "1m"): "ok", ("ETH", "1m"): "ok"})
+        self.assertEqual([v["klines"] for v in summary.values()], [5000, 5000])
+
+    def test_resume_counts_only_new_klines(self) -> None:
+        self.sync()
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                self.assertEqual([v["klines"] for v in self.sync(workers=workers).values()], [0, 0])
+                self.exchange.client.rows += 500
+                self.assertEqual([v["klines"] for v in self.sync(workers=workers).values()], [500, 500])
+
+    def test_batch_size(self) -> None:
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                self.exchange.client.requests = 0
+                summary = self.sync(workers=workers, batch_size=250)
+                self.assertEqual([v["klines"] for v in summary.values()], [5000, 5000])
+                # 20 full pages and the last page of each pair
+                self.assertEqual(self.exchange.client.requests, 2*21)
+                self.exchange.client.rows += 5000
+
+    def test_failed_insert_ends_the_task(self) -> None:
+        store_kline_rows = self.exchange.store_kline_rows
+        calls = []
+        def failing_store(currency_interval, rows):
+            calls.append(currency_interval["currency_id"])
+            if len(calls) == 1:
+                return 0, 0
+            return store_kline_rows(currency_interval, rows)
+        self.exchange.store_kline_rows = failing_store
+        summary = self.sync(workers=2)
+        statuses = sorted(v["status"] for v in summary.values())
+        self.assertEqual(statuses, ["failed", "ok"])
+        failed = [v for v in summary.values() if v["status"] == "failed"][0]
+        self.assertIsNotNone(failed["error"])
+
+if __name__ == "__main__":
+    unittest.main()
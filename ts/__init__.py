@@ -1,3 +1,36 @@
-from .exchangers import Exchange
-from .utils import timestamp2datetime
-__version__ = exchangers.__version__
\ No newline at end of file
+"""Time series of crypto currencies: klines sync, storage and analysis.
+The submodules and their names are imported on first use, `import ts` does not load
+the binance client, pandas or the analysis modules until they are needed."""
+import importlib
+
+__version__ = '0.0.1'
+
+# Public name: submodule that defines it
+_LAZY_ATTRIBUTES = {
+    "Exchange": "exchangers",
+    "Connection": "db",
+    "KlineStore": "store",
+    "ReplayClient": "replay",
+    "TSError": "utils",
+    "timestamp2datetime": "utils",
+    "timestamps2datetime": "utils",
+    "METRICS": "metrics",
+    "configure_logging": "metrics",
+}
+_SUBMODULES = ["cli", "crossover", "db", "decomposition", "evaluation", "exchangers", "gaps", "live", "metrics",
+    "panel", "replay", "rollup", "scheduler", "store", "tda", "utils"]
+
+__all__ = list(_LAZY_ATTRIBUTES) + _SUBMODULES
+
+def __getattr__(name:str):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module("." + _LAZY_ATTRIBUTES[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    globals()[name] = value
+    return value
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Entry point of python -m ts, see ts.cli
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+import sys
+from .cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Command line interface: python -m ts {sync,backfill,export,stats}
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+
+The subcommands only import the modules they use, export and stats never load the binance client.
+Exit codes: 0 ok, 1 some pairs failed, 2 invalid arguments, 3 error (e.g. DB or schemas not found).
+The Binance credentials are read from the BINANCE_API_KEY and BINANCE_API_SECRET environment variables.
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import os
+import json
+import logging
+import argparse
+from .metrics import configure_logging, get_logger
+from .utils import TSError
+
+EXIT_OK, EXIT_FAILED, EXIT_USAGE, EXIT_ERROR = 0, 1, 2, 3
+# The repository root, where the schemas directory lives
+DEFAULT_BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_FILE = "data/data.db"
+
+logger = get_logger("cli")
+
+def _currencies(args, default:dict) -> dict:
+    """The CURRENCIES selected by --currencies, unknown names use the name as description"""
+    if not args.currencies:
+        return dict(default)
+    return {c:default.get(c, c) for c in args.currencies}
+
+def _exchange(args):
+    """Exchange of the sync and backfill subcommands, over the ReplayClient with --replay"""
+    from .exchangers import Exchange
+    client = None
+    if args.replay:
+        from .replay import ReplayClient
+        client = ReplayClient(rows=args.replay)
+    exchange = Exchange(os.environ.get("BINANCE_API_KEY"), os.environ.get("BINANCE_API_SECRET"),
+        base_path=args.base_path, db_file=args.db, client=client, concurrent_reads=args.concurrent_reads)
+    exchange.CURRENCIES = _currencies(args, exchange.CURRENCIES)
+    return exchange
+
+def _connection(args):
+    """Connection of the read only subcommands, the DB must exist"""
+    from .db import Connection
+    db_file = os.path.join(args.base_path, args.db) if not args.db[0] == "/" else args.db
+    if not os.path.isfile(db_file):
+        raise TSError("SQLite DB '{}' does not exist".format(db_file))
+    return Connection(args.base_path, args.db)
+
+def _batch_size(value:str) -> int:
+    """argparse type of --batch-size, the klines by request are capped by the exchange"""
+    from .exchangers import Exchange
+    batch_size = int(value)
+    if not 1 <= batch_size <= Exchange.KLINE_PAGE_LIMIT:
+        raise argparse.ArgumentTypeError("expected 1 to {}".format(Exchange.KLINE_PAGE_LIMIT))
+    return batch_size
+
+def _summary_exit(summary:dict) -> int:
+    return EXIT_FAILED if any(v["status"] != "ok" for v in summary.values()) else EXIT_OK
+
+def cmd_sync(args) -> int:
+    exchange = _exchange(args)
+    profile = args.profile if args.profile != "-" else True
+    summary = exchange.sync_data(args.intervals or [], batch_size=args.batch_size, workers=args.workers,
+        rollup=args.rollup, profile=profile)
+    return _summary_exit(summary)
+
+def cmd_backfill(args) -> int:
+    exchange = _exchange(args)
+    summary = exchange.backfill_data(args.intervals or [], currencies=list(exchange.CURRENCIES.keys()),
+        start=args.start, end=args.end)
+    for (currency_name, interval_name), v in summary.items():
+        print("{:<8} {:<4} {:>6} gaps {:>10} klines  coverage {:.4%}".format(currency_name, interval_name,
+            len(v["gaps"]), v["klines"], v["coverage"]["coverage"]))
+    return _summary_exit(summary)
+
+def cmd_export(args) -> int:
+    from .store import KlineStore
+    db_conn = _connection(args)
+    pairs = [(s["currency"], s["interval"]) for s in db_conn.kline_stats() if s["klines"] > 0
+        and (not args.currencies or s["currency"] in args.currencies)
+        and (not args.intervals or s["interval"] in args.intervals)]
+    written = KlineStore(args.store).export_all(db_conn, pairs, store_format=args.format)
+    for (currency_name, interval_name), partitions in written.items():
+        print("{:<8} {:<4} {:>4} partitions written".format(currency_name, interval_name, partitions))
+    return EXIT_OK
+
+def cmd_stats(args) -> int:
+    db_conn = _connection(args)
+    stats = [s for s in db_conn.kline_stats() if (not args.currencies or s["currency"] in args.currencies)
+        and (not args.intervals or s["interval"] in args.intervals)]
+    if args.gaps:
+        from .gaps import scan_gaps
+        for s in stats:
+            report = scan_gaps(db_conn, s["currency"], s["interval"])
+            s.update(gaps=len(report["gaps"]), missing=report["missing"], coverage=report["coverage"])
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return EXIT_OK
+    from .utils import timestamps2datetime
+    print("{:<8} {:<4} {:>10} {:>20} {:>20}{}".format("currency", "int", "klines", "first", "last",
+        " {:>6} {:>10}".format("gaps", "coverage") if args.gaps else ""))
+    for s in stats:
+        first, last = [str(timestamps2datetime([t], unit="s")[0].astype("datetime64[s]")) if t is not None else "-"
+            for t in (s["first_open_time"], s["last_open_time"])]
+        print("{:<8} {:<4} {:>10} {:>20} {:>20}{}".format(s["currency"], s["interval"], s["klines"], first, last,
+            " {:>6} {:>10.4%}".format(s["gaps"], s["coverage"]) if args.gaps else ""))
+    return EXIT_OK
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ts", description="Crypto currency klines sync and storage")
+    parser.add_argument("--db", default=DEFAULT_DB_FILE, help="SQLite DB file, relative to the base path")
+    parser.add_argument("--base-path", default=DEFAULT_BASE_PATH, help="directory with the schemas directory")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR", "OFF"])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def pair_arguments(subparser):
+        subparser.add_argument("--currencies", nargs="+", help="currency names, e.g. BTC ETH (default all)")
+        subparser.add_argument("--intervals", nargs="+", help="kline intervals, e.g. 1m 1h (default all)")
+
+    def exchange_arguments(subparser):
+        pair_arguments(subparser)
+        subparser.add_argument("--replay", type=int, metavar="ROWS", help="use the offline ReplayClient with ROWS klines by pair")
+        subparser.add_argument("--concurrent-reads", action="store_true", help="WAL mode with the clustered klines table")
+
+    sync = subparsers.add_parser("sync", help="download the new klines")
+    exchange_arguments(sync)
+    sync.add_argument("--workers", type=int, default=1, help="download threads")
+    sync.add_argument("--batch-size", type=_batch_size, default=1000, help="klines by request and transaction (max 1000)")
+    sync.add_argument("--rollup", action="store_true", help="download 1m and build the other intervals from it")
+    sync.add_argument("--profile", nargs="?", const="-", help="write the timing breakdown to a file (log it without a value)")
+    sync.set_defaults(func=cmd_sync)
+
+    backfill = subparsers.add_parser("backfill", help="fetch only the missing klines of the stored pairs")
+    exchange_arguments(backfill)
+    backfill.add_argument("--start", type=int, help="expected first open time, epoch seconds")
+    backfill.add_argument("--end", type=int, help="expected last open time, epoch seconds")
+    backfill.set_defaults(func=cmd_backfill)
+
+    export = subparsers.add_parser("export", help="export the stored klines to the columnar store")
+    pair_arguments(export)
+    export.add_argument("--store", required=True, help="the store directory")
+    export.add_argument("--format", default="npy", choices=["npy", "parquet"])
+    export.set_defaults(func=cmd_export)
+
+    stats = subparsers.add_parser("stats", help="klines stored by pair")
+    pair_arguments(stats)
+    stats.add_argument("--gaps", action="store_true", help="scan the gaps and coverage of each pair")
+    stats.add_argument("--json", action="store_true", help="print the stats as JSON")
+    stats.set_defaults(func=cmd_stats)
+    return parser
+
+def main(argv:list=None) -> int:
+    """Run the command line
+    :param argv: the arguments, default to sys.argv[1:]
+    :return: the exit code
+    """
+    try:
+        args = build_parser().parse_args(argv)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else EXIT_USAGE
+    configure_logging(logging.CRITICAL + 1 if args.log_level == "OFF" else getattr(logging, args.log_level))
+    try:
+        return args.func(args)
+    except TSError as e:
+        logger.error("%s", e)
+        return EXIT_ERROR
+    except KeyboardInterrupt:
+        logger.warning("Interrupted")
+        return EXIT_FAILED
@@ -14,24 +14,284 @@ __maintainer__ = 'Jose Luis Bracamonte Amavizca'
 __email__ = 'luisjba@gmail.com'
 __status__ = 'Development'
 
+import os, math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+from .utils import TSError, timestamps2datetime
 
 BINANCE_COLUMNS = ["open_time","open","high","low","close","volume","close_time","quote_asset_volume","trades_count",
 "taker_buy_base_asset_volume","taker_buy_quote_asset_volume","unused"]
+DATE_COLUMNS = ["open_time", "close_time"]
+INT_COLUMNS = ["trades_count"]
 
-def binanceData2DataFrame(klines_list:list) -> pd.DataFrame:
-    """Convert Binance klines data to pandas DataFrame"""
-    df = pd.DataFrame(klines_list, columns=BINANCE_COLUMNS)
-    # formatting dates columns
-    date_columns = ["open_time", "close_time"]
-    for c in date_columns:
-        df[c] = pd.to_datetime(df[c]/1000, unit="s")
-    # formatting numeric columns
-    numeric_columns = [c for c  in BINANCE_COLUMNS if c not in date_columns]
-    df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric)
-    # set the open_time as index for the time series
-    df.set_index('open_time', inplace=True)
-    return df
+def binanceData2DataFrame(klines_list:list, compact:bool=False, tz=None) -> pd.DataFrame:
+    """Convert Binance klines data to pandas DataFrame. Each column is parsed once into a typed
+    NumPy array, the epoch milliseconds become exact datetime64[ms] values and the unused column is dropped.
+    :param klines_list: the list of klines as returned by the Binance client
+    :param compact: use float32 and int32 for the numeric columns to halve the memory
+    :param tz: time zone of the dates, see utils.timestamps2datetime (None keeps them naive UTC)
+    :return: DataFrame indexed by open_time
+    """
+    float_type, int_type = (np.float32, np.int32) if compact else (np.float64, np.int64)
+    block = np.array(klines_list, dtype=object).reshape(len(klines_list), len(BINANCE_COLUMNS))
+    data = {}
+    for i, c in enumerate(BINANCE_COLUMNS):
+        if c == "unused":
+            continue
+        if c in DATE_COLUMNS:
+            data[c] = timestamps2datetime(block[:, i].astype(np.int64), tz=tz)
+        elif c in INT_COLUMNS:
+            data[c] = block[:, i].astype(int_type)
+        else:
+            # the prices and volumes arrive as strings, parsed once to float64
+            data[c] = block[:, i].astype(np.float64).astype(float_type, copy=False)
+    index = pd.DatetimeIndex(data.pop("open_time"), name="open_time")
+    return pd.DataFrame(data, index=index)
 
+MA_KINDS = ["sma", "ema"]
 
+def sma_matrix(close:np.ndarray, windows) -> np.ndarray:
+    """Simple moving averages of many windows over one cumulative sum, each row is written in place
+    without (windows x time) temporaries
+    :param close: 1-D array of prices
+    :param windows: list of window lengths
+    :return: 2-D array (windows x time), NaN until each window is filled
+    """
+    close = np.asarray(close, dtype=np.float64)
+    cs = np.concatenate([[0.0], np.cumsum(close)])
+    sma = np.full((len(windows), len(close)), np.nan)
+    for i, w in enumerate(windows):
+        w = int(w)
+        if 0 < w <= len(close):
+            row = sma[i, w - 1:]
+            np.subtract(cs[w:], cs[:-w], out=row)
+            row /= w
+    return sma
 
+def ema_matrix(close:np.ndarray, windows) -> np.ndarray:
+    """Exponential moving averages (span=window, no adjust) of many windows
+    :return: 2-D array (windows x time), NaN until each window is filled
+    """
+    close = pd.Series(np.asarray(close, dtype=np.float64))
+    ema = np.vstack([close.ewm(span=w, adjust=False, min_periods=w).mean().to_numpy() for w in windows]) \
+        if len(windows) > 0 else np.empty((0, len(close)))
+    return ema
+
+def ma_matrix(close:np.ndarray, windows, kind:str="sma") -> np.ndarray:
+    """Moving averages of many windows, see sma_matrix and ema_matrix"""
+    if kind not in MA_KINDS:
+        raise ValueError("Invalid moving average '{}', expected one of: {}".format(kind, ", ".join(MA_KINDS)))
+    return sma_matrix(close, windows) if kind == "sma" else ema_matrix(close, windows)
+
+def _crossover_stats(positions:np.ndarray, log_returns:np.ndarray, fee:float) -> dict:
+    """PnL, drawdown, trades and exposure of many position rows over the same returns
+    :param positions: 2-D array (strategies x time) of -1, 0, 1 positions taken at the close
+    :param log_returns: 1-D array of the next bar log returns (length time - 1)
+    """
+    held = positions[:, :-1]
+    changes = np.abs(np.diff(positions, axis=1, prepend=0))
+    strategy = held*log_returns[None, :]
+    if fee > 0:
+        strategy += np.log1p(-fee)*changes[:, :-1]
+    # in place, the strategy returns become the equity and the running peak becomes the drop
+    equity = np.cumsum(strategy, axis=1, out=strategy)
+    if equity.shape[1] == 0:
+        equity = np.zeros((len(positions), 1))
+    # the deepest log drop from the running peak, the exp is taken once by strategy
+    drop = np.maximum.accumulate(equity, axis=1)
+    np.maximum(drop, 0.0, out=drop)
+    drop = np.subtract(equity, drop, out=drop).min(axis=1)
+    return {
+        "total_return": np.expm1(equity[:, -1]),
+        "max_drawdown": -np.expm1(drop),
+        "trades": changes.sum(axis=1, dtype=np.int64),
+        "exposure": np.abs(held).mean(axis=1) if held.shape[1] > 0 else np.zeros(len(positions)),
+    }
+
+def crossover_positions(fast_ma:np.ndarray, slow_ma:np.ndarray, allow_short:bool=False) -> np.ndarray:
+    """Long while the fast average is above the slow one, short (or flat) otherwise, flat during the warm up"""
+    with np.errstate(invalid="ignore"):
+        positions = np.where(fast_ma > slow_ma, 1, -1 if allow_short else 0).astype(np.int8)
+    positions[np.isnan(fast_ma) | np.isnan(slow_ma)] = 0
+    return positions
+
+def backtest(close, fast:int, slow:int, kind:str="sma", allow_short:bool=False, fee:float=0.0) -> pd.DataFrame:
+    """Backtest a single moving average crossover
+    :param close: the close prices, array or Series (its index is kept)
+    :param fast: the fast window length
+    :param slow: the slow window length
+    :param kind: 'sma' or 'ema'
+    :param allow_short: go short when the fast average is below the slow one, otherwise stay flat
+    :param fee: fraction of the equity paid on each position change
+    :return: DataFrame with close, fast_ma, slow_ma, signal, position, returns, equity and drawdown columns
+    """
+    index = close.index if isinstance(close, pd.Series) else None
+    close = np.asarray(close, dtype=np.float64)
+    mas = ma_matrix(close, [fast, slow], kind)
+    position = crossover_positions(mas[0], mas[1], allow_short)
+    log_returns = np.diff(np.log(close), prepend=np.nan)
+    changes = np.abs(np.diff(position, prepend=0))
+    # the position taken at a close earns the next bar return
+    held = np.concatenate([[0], position[:-1]])
+    strategy = np.nan_to_num(held*log_returns) + np.log1p(-fee)*np.concatenate([[0], changes[:-1]])
+    equity = np.cumsum(strategy)
+    return pd.DataFrame({
+        "close": close,
+        "fast_ma": mas[0],
+        "slow_ma": mas[1],
+        "signal": np.diff(position, prepend=0),
+        "position": position,
+        "returns": np.expm1(strategy),
+        "equity": np.exp(equity),
+        "drawdown": 1 - np.exp(equity - np.maximum(np.maximum.accumulate(equity), 0.0)),
+    }, index=index)
+
+def sweep(close, fast_windows, slow_windows, kinds:list=["sma"], allow_short:bool=False, fee:float=0.0,
+        max_cells:int=20000000) -> pd.DataFrame:
+    """Backtest every (fast, slow) window pair with fast < slow. The slow windows are split in chunks of
+    max_cells//len(close) windows, the moving averages of a chunk are computed once and its pairs are
+    evaluated with 2-D broadcasting, one fast window at a time.
+    :param close: the close prices
+    :param fast_windows: list of fast window lengths
+    :param slow_windows: list of slow window lengths
+    :param kinds: moving average kinds, 'sma' and/or 'ema'
+    :param max_cells: max windows x time cells of a chunk, the peak memory is a few float64 arrays of
+        this size (about 8*max_cells bytes each)
+    :return: DataFrame with kind, fast, slow, total_return, max_drawdown, trades and exposure by pair
+    """
+    close = np.asarray(close, dtype=np.float64)
+    fast_windows, slow_windows = sorted(set(fast_windows)), sorted(set(slow_windows))
+    log_returns = np.diff(np.log(close))
+    chunk = max(1, max_cells//max(1, len(close)))
+    results = []
+    columns = ["kind", "fast", "slow", "total_return", "max_drawdown", "trades", "exposure"]
+    for kind in kinds:
+        kind_results = []
+        for first in range(0, len(slow_windows), chunk):
+            slows = slow_windows[first:first + chunk]
+            slow_ma = ma_matrix(close, slows, kind)
+            for fast in fast_windows:
+                rows = [i for i, w in enumerate(slows) if w > fast]
+                if len(rows) == 0:
+                    continue
+                # one row, computed again by chunk instead of keeping the averages of every fast window
+                fast_ma = ma_matrix(close, [fast], kind)[0]
+                positions = crossover_positions(fast_ma[None, :], slow_ma[rows], allow_short)
+                stats = _crossover_stats(positions, log_returns, fee)
+                stats.update({"kind":kind, "fast":fast, "slow":[slows[i] for i in rows]})
+                kind_results.append(pd.DataFrame(stats))
+            del slow_ma
+        if len(kind_results) > 0:
+            results.append(pd.concat(kind_results).sort_values(["fast", "slow"], kind="stable"))
+    if len(results) == 0:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(results, ignore_index=True)[columns]
+
+def _sweep_pair(db_file:str, currency_name:str, interval_name:str, fast_windows, slow_windows, kinds:list,
+        allow_short:bool, fee:float) -> pd.DataFrame:
+    """Process pool task: read a pair close prices from the DB and sweep it"""
+    from .db import Connection
+    db_conn = Connection(os.path.dirname(db_file), db_file)
+    close = db_conn.read_kline_arrays(currency_name, interval_name)["close"]
+    db_conn.db_conn.close()
+    result = sweep(close, fast_windows, slow_windows, kinds, allow_short, fee)
+    result.insert(0, "interval", interval_name)
+    result.insert(0, "currency", currency_name)
+    return result
+
+def sweep_database(db_file:str, pairs:list, fast_windows, slow_windows, kinds:list=["sma"], 
+        allow_short:bool=False, fee:float=0.0, processes:int=None) -> pd.DataFrame:
+    """Sweep the crossover windows over many (currency, interval) pairs stored in the klines DB,
+    spread across a process pool where each process reads its own pair
+    :param db_file: the SQLite DB file, a relative path is relative to the working directory
+    :param pairs: list of (currency_name, interval_name) tuples
+    :param processes: number of processes, None uses the CPU count and 1 runs in this process
+    :return: the sweep DataFrame of all the pairs with currency and interval columns
+    """
+    db_file = os.path.abspath(db_file)
+    if not os.path.isfile(db_file):
+        raise TSError("SQLite DB '{}' does not exist".format(db_file))
+    args = [(db_file, c, i, fast_windows, slow_windows, kinds, allow_short, fee) for c, i in pairs]
+    if processes == 1 or len(pairs) <= 1:
+        results = [_sweep_pair(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_sweep_pair, *zip(*args)))
+    if len(results) == 0:
+        return pd.DataFrame()
+    return pd.concat(results, ignore_index=True)
+
+class RollingSMA:
+    """Simple moving average updated in O(1) by observation"""
+    def __init__(self, window:int) -> None:
+        self.window:int = window
+        self._values:deque = deque(maxlen=window)
+        self._sum:float = 0.0
+        self._updates:int = 0
+
+    def update(self, value:float) -> float:
+        """Add an observation and return the current average"""
+        if len(self._values) == self.window:
+            self._sum -= self._values[0]
+        self._values.append(value)
+        self._sum += value
+        self._updates += 1
+        if self._updates % self.window == 0: # drop the accumulated rounding error, amortized O(1)
+            self._sum = math.fsum(self._values)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        """The current average, NaN until the window is filled"""
+        return self._sum/self.window if len(self._values) == self.window else np.nan
+
+class RollingEMA:
+    """Exponential moving average (span=window, no adjust) updated in O(1) by observation,
+    same values as ema_matrix"""
+    def __init__(self, window:int) -> None:
+        self.window:int = window
+        self.alpha:float = 2/(window + 1)
+        self._ema:float = np.nan
+        self._count:int = 0
+
+    def update(self, value:float) -> float:
+        """Add an observation and return the current average"""
+        self._ema = value if self._count == 0 else self.alpha*value + (1 - self.alpha)*self._ema
+        self._count += 1
+        return self.value
+
+    @property
+    def value(self) -> float:
+        """The current average, NaN until the window is filled"""
+        return self._ema if self._count >= self.window else np.nan
+
+class CrossoverState:
+    """Incremental moving average crossover, same positions as crossover_positions"""
+    def __init__(self, fast:int, slow:int, kind:str="sma", allow_short:bool=False) -> None:
+        if kind not in MA_KINDS:
+            raise ValueError("Invalid moving average '{}', expected one of: {}".format(kind, ", ".join(MA_KINDS)))
+        average = RollingSMA if kind == "sma" else RollingEMA
+        self.fast, self.slow, self.kind = fast, slow, kind
+        self.allow_short:bool = allow_short
+        self.fast_ma, self.slow_ma = average(fast), average(slow)
+        self.position:int = 0
+
+    def update(self, close:float) -> int:
+        """Add a close price
+        :return: the signal, the change of position (0 when the position is kept)
+        """
+        fast, slow = self.fast_ma.update(close), self.slow_ma.update(close)
+        previous = self.position
+        if np.isnan(fast) or np.isnan(slow):
+            self.position = 0
+        else:
+            self.position = 1 if fast > slow else (-1 if self.allow_short else 0)
+        return self.position - previous
+
+    def warm_up(self, closes) -> "CrossoverState":
+        """Feed the historical close prices"""
+        for close in closes:
+            self.update(float(close))
+        return self
@@ -13,26 +13,307 @@ __maintainer__ = 'Jose Luis Bracamonte Amavizca'
 __email__ = 'luisjba@gmail.com'
 __status__ = 'Development'
 
-import os, sys
+import os
+import queue
 import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import quote
 from sqlite3 import Error, Row
-from .utils import print_fail, print_okgreen, print_warning
+import numpy as np
+from .metrics import METRICS, get_logger
+from .utils import TSError, timestamps2datetime
+
+logger = get_logger("db")
+
+# Kline value columns in the same order as the Binance kline list (without the ids)
+KLINE_VALUE_COLUMNS = ["open_time", "open", "high", "low", "close", "volume", "close_time", "quote_asset_volume",
+    "trades_count", "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume"]
+KLINE_KEY_COLUMNS = ["currency_id", "currency_interval_id", "open_time"]
+KLINE_COLUMNS = ["currency_id", "currency_interval_id", "interval_name"] + KLINE_VALUE_COLUMNS
+KLINE_INT_COLUMNS = ["open_time", "close_time", "trades_count"]
+KLINE_DTYPES = {c:(np.int64 if c in KLINE_INT_COLUMNS else np.float64) for c in KLINE_VALUE_COLUMNS}
+
+def kline_arrays2frame(arrays:dict, tz=None):
+    """Build a DataFrame indexed by open_time from the typed kline columns, the 
+    open and close times (epoch seconds) are converted to datetime64
+    :param tz: time zone of the dates, see utils.timestamps2datetime (None keeps them naive UTC)
+    """
+    import pandas as pd
+    df = pd.DataFrame({c:arrays[c] for c in KLINE_VALUE_COLUMNS if c != "open_time"}, 
+        index=pd.DatetimeIndex(timestamps2datetime(arrays["open_time"], tz=tz, unit="s"), name="open_time"))
+    df["close_time"] = timestamps2datetime(arrays["close_time"], tz=tz, unit="s")
+    return df
+
+# Pragmas of the concurrent read mode: 64 MB page cache and 256 MB memory map by connection
+CONCURRENT_PRAGMAS = {
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+    "busy_timeout": 5000,
+}
+# klines clustered on its key, the time range reads of a pair are sequential
+KLINES_CLUSTERED_DDL = '''CREATE TABLE IF NOT EXISTS klines_clustered(
+    currency_id INTEGER NOT NULL,
+    currency_interval_id INTEGER NOT NULL,
+    interval_name TEXT NOT NULL,
+    open_time INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    close_time INTEGER NOT NULL,
+    quote_asset_volume REAL NOT NULL,
+    trades_count INTEGER NOT NULL,
+    taker_buy_base_asset_volume REAL NOT NULL,
+    taker_buy_quote_asset_volume REAL NOT NULL,
+    FOREIGN KEY (currency_id) REFERENCES currency (id),
+    FOREIGN KEY (currency_interval_id) REFERENCES currency_interval (id),
+    PRIMARY KEY(currency_id, currency_interval_id, open_time)
+) WITHOUT ROWID;'''
+
+QUERY_CACHE_SIZE = 256
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _insert_query(table:str, columns:tuple, columns_timestamp:tuple) -> str:
+    values_stmt = ["?"]*len(columns) + ["strftime('%s', 'now')"]*len(columns_timestamp)
+    return '''INSERT INTO {table}({columns})
+            VALUES({values});'''.format(
+                table=table, 
+                columns=",".join(columns + columns_timestamp), 
+                values=",".join(values_stmt)
+            )
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _update_query(table:str, columns:tuple, keys:tuple, columns_timestamp:tuple) -> str:
+    values_stmt = ["{} = ?".format(v) for v in columns] \
+        + ["{} = strftime('%s', 'now')".format(c) for c in columns_timestamp]
+    return '''UPDATE {table} SET {values}
+            WHERE {condition};'''.format(
+                table=table, 
+                values=",".join(values_stmt),
+                condition=" AND ".join(["{} = ?".format(k) for k in keys])
+            )
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _delete_query(table:str, condition_columns:tuple) -> str:
+    return '''DELETE FROM {table} WHERE {condition};'''.format(
+                table=table,
+                condition=" AND ".join(["{} = ?".format(c) for c in condition_columns])
+            )
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _fetch_query(table:str, columns:tuple, condition_columns:tuple, order:tuple) -> str:
+    order_by = ""
+    if len(order) > 0:
+        order_by = "ORDER BY {}".format(",".join(["{} {}".format(k, "ASC" if d.lower().startswith("asc") else "DESC") for k, d in order]))
+    return '''SELECT {columns} FROM {table} {condition} {order_by};'''.format(
+            table=table, 
+            columns=",".join(columns),
+            condition="WHERE " + " AND ".join(["{} = ?".format(c) for c in condition_columns]) if len(condition_columns) > 0 else "",
+            order_by = order_by
+        )
+
+@lru_cache(maxsize=len(["ignore", "replace", "abort"]))
+def _kline_insert_query(on_conflict:str) -> str:
+    upsert = ""
+    if on_conflict == "replace":
+        upsert = " ON CONFLICT({}) DO UPDATE SET {}".format(
+            ",".join(KLINE_KEY_COLUMNS),
+            ",".join(["{c} = excluded.{c}".format(c=c) for c in KLINE_COLUMNS if c not in KLINE_KEY_COLUMNS])
+        )
+    return '''INSERT {ignore}INTO klines({columns})
+            VALUES({values}){upsert};'''.format(
+                ignore="OR IGNORE " if on_conflict == "ignore" else "",
+                columns=",".join(KLINE_COLUMNS),
+                values=",".join(["?"]*len(KLINE_COLUMNS)),
+                upsert=upsert
+            )
+
+class LRUCache():
+    """Thread safe least recently used cache of DB rows with hit and miss counters.
+    The keys are tuples starting with the table name."""
+    def __init__(self, maxsize:int=256) -> None:
+        self.maxsize:int = maxsize
+        self.hits:int = 0
+        self.misses:int = 0
+        self._items:OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key:tuple):
+        """The cached value or None"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key:tuple, value) -> None:
+        if value is None:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, table:str=None, row_id:int=None) -> None:
+        """Drop the cached rows of a table (all the tables if None), only the row with the id if given"""
+        with self._lock:
+            for key in [k for k, v in self._items.items() 
+                    if (table is None or k[0] == table) and (row_id is None or v["id"] == row_id)]:
+                del self._items[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items), "maxsize": self.maxsize}
+
+class ReadPool():
+    """Pool of read-only connections to serve many reader threads, each thread
+    borrows a connection for the time of its query"""
+    def __init__(self, db_file:str, size:int=4, pragmas:dict=CONCURRENT_PRAGMAS) -> None:
+        self.db_file:str = db_file
+        self.size:int = max(1, size)
+        self.pragmas:dict = pragmas
+        self._idle:queue.Queue = queue.Queue()
+        self._created:int = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        db_conn = sqlite3.connect("file:{}?mode=ro".format(quote(os.path.abspath(self.db_file))), uri=True, 
+            check_same_thread=False)
+        for pragma, value in self.pragmas.items():
+            db_conn.execute("PRAGMA {} = {};".format(pragma, value))
+        return db_conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a read-only connection, blocks while all the pool connections are in use"""
+        db_conn = None
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                try:
+                    db_conn = self._connect()
+                except Error:
+                    self._created -= 1
+                    raise
+        if db_conn is None:
+            db_conn = self._idle.get()
+        try:
+            yield db_conn
+        finally:
+            self._idle.put(db_conn)
+
+    def close(self) -> None:
+        """Close the idle connections"""
+        while not self._idle.empty():
+            self._idle.get().close()
+            with self._lock:
+                self._created -= 1
 
 class Connection():
-    def __init__(self, base_path:str, db_file:str):
+    KLINE_CONFLICT_ACTIONS = ["ignore", "replace", "abort"]
+    KLINE_CHUNK_SIZE = 100000
+    # Advance the transaction dates of a currency interval, never backwards
+    CHECKPOINT_QUERY = '''UPDATE currency_interval SET 
+            first_transaction_date = CASE WHEN first_transaction_date <= 0 THEN ? ELSE first_transaction_date END,
+            last_transaction_date = MAX(last_transaction_date, ?),
+            last_updated = strftime('%s', 'now')
+        WHERE id = ?;'''
+
+    def __init__(self, base_path:str, db_file:str, concurrent_reads:bool=False, read_pool_size:int=4,
+            metadata_cache_size:int=256):
+        """
+        :param base_path: the base path of a relative db_file
+        :param db_file: the SQLite DB file
+        :param concurrent_reads: high concurrency mode, WAL journal with tuned pragmas and the reads 
+            served by a pool of read-only connections safe to use from many threads
+        :param read_pool_size: max read-only connections of the concurrent mode
+        :param metadata_cache_size: max currency and currency interval rows cached
+        """
         super().__init__()
         self.base_path:str = base_path
         self.db_file = os.path.join(self.base_path, db_file) if not db_file[0] == "/" else db_file
         if not os.path.isfile(self.db_file):
             make_dir = os.path.split(self.db_file)[0]
             os.makedirs(make_dir, exist_ok=True)
-            print_okgreen("Created the directory for SQLlite database: {}".format(make_dir))
+            logger.info("Created the directory for SQLite database", extra={"path": make_dir})
         try:
            self.db_conn:sqlite3.Connection = sqlite3.connect(self.db_file)
         except Error as e:
             self.db_conn:sqlite3.Connection = None
-            print_fail("Error Connecting to SQLLite DB: {}".format(self.db_file))
-            sys.exit(1)
+            raise TSError("Error Connecting to SQLLite DB '{}': {}".format(self.db_file, e)) from e
+        self.metadata_cache:LRUCache = LRUCache(metadata_cache_size)
+        self._data_version:int = None
+        # the thread of the writer connection, the only one using the metadata cache
+        self._owner_thread:int = threading.get_ident()
+        self.read_pool:ReadPool = None
+        if concurrent_reads:
+            self.enable_concurrent_reads(read_pool_size)
+
+    def enable_concurrent_reads(self, read_pool_size:int=4) -> bool:
+        """Switch to the WAL journal (readers do not block the writer nor the other way around),
+        tune the pragmas and serve the reads with a ReadPool
+        :return: true if the WAL journal is enabled
+        """
+        try:
+            journal_mode = self.db_conn.execute("PRAGMA journal_mode = WAL;").fetchone()[0]
+            # with WAL, NORMAL only syncs on checkpoints and keeps the DB consistent
+            self.db_conn.execute("PRAGMA synchronous = NORMAL;")
+            for pragma, value in CONCURRENT_PRAGMAS.items():
+                self.db_conn.execute("PRAGMA {} = {};".format(pragma, value))
+        except Error as e:
+            logger.error("SQLite concurrent mode error: %s", e)
+            return False
+        if journal_mode.lower() != "wal":
+            logger.warning("SQLite DB does not support the WAL journal mode", extra={"db_file": self.db_file, "journal_mode": journal_mode})
+            return False
+        self.read_pool = ReadPool(self.db_file, read_pool_size)
+        return True
+
+    @contextmanager
+    def reading(self):
+        """The connection to run a read query, from the ReadPool in the concurrent mode"""
+        if self.read_pool is None:
+            yield self.db_conn
+        else:
+            with self.read_pool.connection() as db_conn:
+                yield db_conn
+
+    def klines_clustered(self) -> bool:
+        """True if the klines table is the WITHOUT ROWID table clustered on its key"""
+        sql = self.db_conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'klines';").fetchone()
+        return sql is not None and "WITHOUT ROWID" in sql[0].upper()
+
+    def migrate_klines_clustered(self) -> bool:
+        """Rebuild the klines table as a WITHOUT ROWID table clustered on (currency_id, currency_interval_id, open_time),
+        the rows of a pair are stored in time order and the separate UNIQUE index goes away
+        :return: true if the klines table is clustered
+        """
+        if self.klines_clustered():
+            return True
+        columns = ",".join(KLINE_COLUMNS)
+        try:
+            self.db_conn.commit()
+            self.db_conn.executescript('''BEGIN IMMEDIATE;
+                {ddl}
+                INSERT INTO klines_clustered({columns}) SELECT {columns} FROM klines ORDER BY {key};
+                DROP TABLE klines;
+                ALTER TABLE klines_clustered RENAME TO klines;
+                COMMIT;'''.format(ddl=KLINES_CLUSTERED_DDL, columns=columns, key=",".join(KLINE_KEY_COLUMNS)))
+        except Error as e:
+            if self.db_conn.in_transaction:
+                self.db_conn.rollback()
+            logger.error("SQLite migrate klines error: %s", e)
+            return False
+        logger.info("Migrated the klines table to a clustered WITHOUT ROWID table", extra={"db_file": self.db_file})
+        return True
 
     def execute_query_nr(self, query:str) -> bool:
         """Execute a query statement into the db
@@ -42,34 +323,28 @@ class Connection():
         try:
             self.db_conn.cursor().execute(query)
         except Error as e:
-            print_fail("SQLite Execute Query Error:{}".format(e))
+            logger.error("SQLite execute query error: %s", e)
             return False
         return True
 
-    def execute_query_insert(self,table:str, values_dict:dict, columns_timestamp=["date_created", "last_updated"]) -> int:
+    def execute_query_insert(self,table:str, values_dict:dict, columns_timestamp:list=["date_created", "last_updated"]) -> int:
         """Insert into db
         :param table: the table name
         :param columns: the list of column names
         :param values: the list of values to insert
         :return: return the las row id inserted
         """
-        columns = list(values_dict.keys())
-        values_stmt = ["?"]*len(columns) + ["strftime('%s', 'now')"]*len(columns_timestamp)
-        query = '''INSERT INTO {table}({columns})
-            VALUES({values});'''.format(
-                table=table, 
-                columns=",".join(columns + columns_timestamp), 
-                values=",".join(values_stmt)
-            )
+        columns = tuple(values_dict.keys())
+        query = _insert_query(table, columns, tuple(columns_timestamp))
         values = [values_dict[k] for k in columns]
         try:
             cursor:sqlite3.Cursor = self.db_conn.cursor().execute(query, values)
             self.db_conn.commit()
             return cursor.lastrowid
         except Error as e:
-            print_fail("SQLite Execute Insert Error:{}".format(e))
-            print_warning(query)
-            print_warning(values)
+            METRICS.count("db.errors")
+            logger.error("SQLite execute insert error: %s", e, extra={"table": table})
+            logger.debug("Failed insert query: %s %s", query, values)
         return 0
 
     def execute_query_update(self,table:str, row:Row, keys:list=["id"], columns_timestamp:list=["last_updated"]) -> int:
@@ -80,71 +355,61 @@ class Connection():
         :return: true if updated
         """
         excluded_cols = keys + columns_timestamp + ["date_created"]
-        columns = [k for k,v in row.items() if k not in excluded_cols]
-        values_stmt = ["{} = ?".format(v) for v in columns] \
-            + ["{} = strftime('%s', 'now')".format(c) for c in columns_timestamp]
-        query = '''UPDATE {table} SET {values}
-            WHERE {condition};'''.format(
-                table=table, 
-                values=",".join(values_stmt),
-                condition=" AND ".join(["{} = ?".format(k) for k in keys])
-            )
-        values = [row[k] for k in (columns + keys)]
+        columns = tuple(k for k in row.keys() if k not in excluded_cols)
+        query = _update_query(table, columns, tuple(keys), tuple(columns_timestamp))
+        values = [row[k] for k in (list(columns) + keys)]
         try:
             self.db_conn.cursor().execute(query, values)
             self.db_conn.commit()
             return True
         except Error as e:
-            print_fail("SQLite Execute Update Error:{} Query:{}".format(e, query))
+            logger.error("SQLite execute update error: %s", e, extra={"table": table})
         return False
     
-    def execute_query_delete(self, table:str, condition_dict:dict={}) -> int:
+    def execute_query_delete(self, table:str, condition_dict:dict=None) -> int:
         """Delete data from db table"""
         if condition_dict is None or type(condition_dict) is not dict or len(condition_dict) == 0:
             return 0
-        condition_columns = list(condition_dict.keys())
-        query = '''DELETE FROM {table} WHERE {condition};'''.format(
-                table=table,
-                condition=" AND ".join(["{} = ?".format(c) for c in condition_columns])
-            )
+        condition_columns = tuple(condition_dict.keys())
+        query = _delete_query(table, condition_columns)
         values = [condition_dict[k] for k in condition_columns]
         try:
             cursor:sqlite3.Cursor = self.db_conn.cursor()
             cursor.row_factory = Row
             return int(cursor.execute(query, values).rowcount)
         except Error as e:
-            print_fail("SQLite Execute Update Error:{}".format(e))
+            logger.error("SQLite execute delete error: %s", e, extra={"table": table})
         return 0
 
-    def execute_query_fetch(self, table:str, columns:list=['*'], condition_dict:dict={}, order:dict={}) -> list:
+    def execute_query_fetch(self, table:str, columns:list=['*'], condition_dict:dict=None, order:dict=None) -> list:
         """Query data form the DB
         :param table: the table name
         :param columns: the list of column names
         :param condition_dict: dictionary with column and value 
         :return: list of result rows
         """
-        if len(condition_dict) == 0:
-            condition_dict[1] = 1
-        condition_columns = list(condition_dict.keys())
-        order_by = ""
-        if len(order) > 0:
-            order_by = "ORDER BY {}".format(",".join(["{} {}".format(k, "ASC" if order[k].lower().startswith("asc") else "DESC") for k in order.keys()]))
-        query = '''SELECT {columns} FROM {table} WHERE {condition} {order_by};'''.format(
-                table=table, 
-                columns=",".join(columns),
-                condition=" AND ".join(["{} = ?".format(c) for c in condition_columns]),
-                order_by = order_by
-            )
+        condition_dict = condition_dict if condition_dict is not None else {}
+        condition_columns = tuple(condition_dict.keys())
+        query = _fetch_query(table, tuple(columns), condition_columns, tuple((order or {}).items()))
         values = [condition_dict[k] for k in condition_columns]
         try:
-            cursor:sqlite3.Cursor = self.db_conn.cursor()
-            cursor.row_factory = Row
-            cursor.execute(query, values)
-            return cursor.fetchall()
+            with METRICS.timer("db.fetch"), self.reading() as db_conn:
+                cursor:sqlite3.Cursor = db_conn.cursor()
+                cursor.row_factory = Row
+                cursor.execute(query, values)
+                return cursor.fetchall()
         except Error as e:
-            print_fail("SQLite Execute Select Error:{} Query:{}".format(e, query))
+            logger.error("SQLite execute select error: %s", e, extra={"query": query})
         return []
 
+    def cache_stats(self) -> dict:
+        """Hit and miss counters of the metadata rows cache and of the query strings caches"""
+        return {
+            "metadata": self.metadata_cache.stats(),
+            "queries": {f.__name__.strip("_"):f.cache_info()._asdict() 
+                for f in [_insert_query, _update_query, _delete_query, _fetch_query, _kline_insert_query]}
+        }
+
     def add_tables(self, ddl_schemas:dict):
         """Create the table based on the ddl_schemas parameter. The
         key of each item correspond to the table name and its value is the table definition.
@@ -160,7 +425,7 @@ class Connection():
         """
         for t,dd_table  in ddl_schemas.items():
                 if self.create_table(dd_table):
-                    print("Created table: {}".format(t))
+                    logger.info("Created the table %s", t, extra={"db_file": self.db_file})
 
     def create_table(self, create_table_statement:str) -> bool:
         """Create a table from a statement
@@ -169,14 +434,39 @@ class Connection():
         """
         return self.execute_query_nr(create_table_statement)
 
+    def _refresh_metadata_cache(self) -> bool:
+        """Drop the metadata cache when another connection or process committed since the last check,
+        the data_version of a connection only changes with the commits of the other connections.
+        The check needs the writer connection, the other threads (concurrent reads) skip the cache.
+        :return: true if the calling thread can use the metadata cache
+        """
+        if threading.get_ident() != self._owner_thread:
+            return False
+        try:
+            data_version = self.db_conn.execute("PRAGMA data_version;").fetchone()[0]
+        except Error as e:
+            logger.error("SQLite data_version error: %s", e)
+            data_version = None
+        if data_version is None or data_version != self._data_version:
+            self.metadata_cache.invalidate()
+        self._data_version = data_version
+        return data_version is not None
+
     def get_currency(self, currency_name:str, pk_column:str="name"):
-        """Get the Currency by name"""
-        currency = self.execute_query_fetch("currency", condition_dict={pk_column:currency_name})
-        return currency[0] if len(currency) > 0 else None
+        """Get the Currency by name, from the metadata cache when possible"""
+        use_cache = self._refresh_metadata_cache()
+        key = ("currency", pk_column, currency_name)
+        currency = self.metadata_cache.get(key) if use_cache else None
+        if currency is None:
+            currencies = self.execute_query_fetch("currency", condition_dict={pk_column:currency_name})
+            currency = currencies[0] if len(currencies) > 0 else None
+            if use_cache:
+                self.metadata_cache.put(key, currency)
+        return currency
     
     def add_currency(self, currency_data:dict) -> Row:
         """Store new currency into the DB"""
-        self.execute_query_insert("currency",currency, columns_timestamp=[])
+        self.execute_query_insert("currency",currency_data, columns_timestamp=[])
         return self.get_currency(currency_data["name"])
     
     def get_or_create_currency(self, currency_data:dict) -> Row:
@@ -189,14 +479,24 @@ class Connection():
     def update_currency(self, currency_data:Row) -> Row:
         """Update the currency information and retrieve the updated value from the DB"""
         self.execute_query_update("currency", currency_data, keys=["id"], columns_timestamp=[])
+        self.metadata_cache.invalidate("currency", currency_data["id"])
         return self.get_currency(currency_data["id"], pk_column="id")
 
-    def get_currency_interval(self, currency_id:int, name:str, pk_column:str="name") -> Row:
-        """Get the currency interval by  name"""
-        currency_interval = self.execute_query_fetch("currency_interval", 
-            condition_dict={"currency_id":currency_id, pk_column:name}
-        )
-        return currency_interval[0] if len(currency_interval) > 0 else None
+    def get_currency_interval(self, currency_id:int, name:str, pk_column:str="name", cached:bool=True) -> Row:
+        """Get the currency interval by  name, from the metadata cache when possible
+        :param cached: False reads the row from the DB, for the reads driven by its checkpoint (last_transaction_date)
+        """
+        use_cache = self._refresh_metadata_cache()
+        key = ("currency_interval", currency_id, pk_column, name)
+        currency_interval = self.metadata_cache.get(key) if cached and use_cache else None
+        if currency_interval is None:
+            currency_intervals = self.execute_query_fetch("currency_interval", 
+                condition_dict={"currency_id":currency_id, pk_column:name}
+            )
+            currency_interval = currency_intervals[0] if len(currency_intervals) > 0 else None
+            if use_cache:
+                self.metadata_cache.put(key, currency_interval)
+        return currency_interval
 
     def add_currency_interval(self, currency_id:int, currency_interval:dict) -> Row:
         """Store new Currency Interval into the DB"""
@@ -207,11 +507,31 @@ class Connection():
 
     def update_currency_interval(self, currency_interval_data:Row) -> Row:
         """Update the Currency interval information and retrieve the updated value from the DB"""
-        self.execute_query_update("branch", currency_interval_data, keys=["id"], columns_timestamp=["last_updated"])
+        self.execute_query_update("currency_interval", currency_interval_data, keys=["id"], columns_timestamp=["last_updated"])
+        self.metadata_cache.invalidate("currency_interval", currency_interval_data["id"])
         return self.get_currency_interval(currency_interval_data["currency_id"], 
             currency_interval_data["id"], pk_column="id"
         )
 
+    def kline_stats(self) -> list:
+        """Klines stored by currency interval with their checkpoint dates
+        :return: list of dictionaries with currency, interval, klines, first_open_time, last_open_time,
+            first_transaction_date and last_transaction_date
+        """
+        query = '''SELECT c.name, ci.name, ci.first_transaction_date, ci.last_transaction_date,
+                (SELECT COUNT(*) FROM klines k WHERE k.currency_id = ci.currency_id AND k.currency_interval_id = ci.id),
+                (SELECT MIN(open_time) FROM klines k WHERE k.currency_id = ci.currency_id AND k.currency_interval_id = ci.id),
+                (SELECT MAX(open_time) FROM klines k WHERE k.currency_id = ci.currency_id AND k.currency_interval_id = ci.id)
+            FROM currency_interval ci JOIN currency c ON c.id = ci.currency_id ORDER BY c.name, ci.id;'''
+        columns = ["currency", "interval", "first_transaction_date", "last_transaction_date", "klines",
+            "first_open_time", "last_open_time"]
+        try:
+            with METRICS.timer("db.fetch"), self.reading() as db_conn:
+                return [dict(zip(columns, row)) for row in db_conn.execute(query).fetchall()]
+        except Error as e:
+            logger.error("SQLite execute select error: %s", e)
+        return []
+
     def get_kline(self, currency_id:int, currency_interval_id:int , open_time:int, pk_column:str="open_time"):
         """Get the kline by currency, interval and open time"""
         kline = self.execute_query_fetch("klines", 
@@ -226,4 +546,182 @@ class Connection():
     def add_kline(self, currency_id:int, currency_interval_id:int , kline_data:dict) -> Row:
         """Store new kline into the DB"""
         self.execute_query_insert("klines",kline_data, columns_timestamp=[])
-        return self.get_kline(currency_id,currency_interval_id, kline_data["open_time"])
\ No newline at end of file
+        return self.get_kline(currency_id,currency_interval_id, kline_data["open_time"])
+
+    def kline_insert_query(self, on_conflict:str="ignore") -> str:
+        """Build the bulk insert statement for the klines table
+        :param on_conflict: 'ignore' keeps the stored row, 'replace' updates it (upsert) 
+            and 'abort' fails on the UNIQUE(currency_id, currency_interval_id, open_time) key
+        :return: the string query statement
+        """
+        if on_conflict not in self.KLINE_CONFLICT_ACTIONS:
+            raise ValueError("Invalid on_conflict '{}', expected one of: {}".format(
+                on_conflict, ", ".join(self.KLINE_CONFLICT_ACTIONS)))
+        return _kline_insert_query(on_conflict)
+
+    def insert_klines(self, currency_id:int, currency_interval_id:int, interval_name:str, rows, 
+            on_conflict:str="ignore", checkpoint:bool=False) -> tuple:
+        """Store a batch of klines into the DB with a single prepared statement and one commit
+        :param currency_id: the currency id of the batch
+        :param currency_interval_id: the currency interval id of the batch
+        :param interval_name: the interval name of the batch
+        :param rows: list of tuples or 2-D NumPy array with the values in KLINE_VALUE_COLUMNS order
+        :param on_conflict: 'ignore', 'replace' or 'abort', see kline_insert_query
+        :param checkpoint: advance the currency interval transaction dates in the same transaction
+        :return: tuple with the number of rows stored and the last open_time of the batch (0 if nothing stored)
+        """
+        if hasattr(rows, "tolist"): # NumPy arrays, bind native python values
+            rows = rows.tolist()
+        if len(rows) == 0:
+            return 0, 0
+        query = self.kline_insert_query(on_conflict)
+        prefix = (currency_id, currency_interval_id, interval_name)
+        first_open_time, last_open_time = min(r[0] for r in rows), max(r[0] for r in rows)
+        try:
+            cursor:sqlite3.Cursor = self.db_conn.cursor()
+            with METRICS.timer("db.insert_batch"):
+                cursor.executemany(query, (prefix + tuple(r) for r in rows))
+                stored = cursor.rowcount
+                if checkpoint:
+                    cursor.execute(self.CHECKPOINT_QUERY, (first_open_time, last_open_time, currency_interval_id))
+            with METRICS.timer("db.commit"):
+                self.db_conn.commit()
+            METRICS.count("db.rows_inserted", stored)
+            if checkpoint:
+                self.metadata_cache.invalidate("currency_interval", currency_interval_id)
+            return stored, last_open_time
+        except Error as e:
+            self.db_conn.rollback()
+            METRICS.count("db.errors")
+            logger.error("SQLite execute bulk insert error: %s", e, extra={"interval": interval_name, "rows": len(rows)})
+        return 0, 0
+
+
+    def _kline_range(self, currency_name:str, interval_name:str, start=None, end=None) -> tuple:
+        """Resolve the where clause and values for a klines time range query, None if the pair does not exist
+        :param start: the first open_time, epoch seconds or datetime (None from the beginning)
+        :param end: the last open_time included, epoch seconds or datetime (None up to the end)
+        """
+        currency = self.get_currency(currency_name)
+        if currency is None:
+            return None
+        currency_interval = self.get_currency_interval(currency["id"], interval_name)
+        if currency_interval is None:
+            return None
+        start, end = [int(t.timestamp()) if hasattr(t, "timestamp") else t for t in (start, end)]
+        condition = "currency_id = ? AND currency_interval_id = ? AND open_time BETWEEN ? AND ?"
+        values = [currency["id"], currency_interval["id"], 
+            start if start is not None else -2**63, end if end is not None else 2**63 - 1]
+        return condition, values
+
+    def iter_kline_arrays(self, currency_name:str, interval_name:str, start=None, end=None, 
+            chunk_size:int=KLINE_CHUNK_SIZE):
+        """Scan the klines of a time range with constant memory
+        :param currency_name: the currency name, e.g. BTC
+        :param interval_name: the kline interval name, e.g. 1m
+        :param start: the first open_time, epoch seconds or datetime (None from the beginning)
+        :param end: the last open_time included, epoch seconds or datetime (None up to the end)
+        :param chunk_size: max klines by chunk
+        :return: generator of dictionaries with the typed NumPy column of each KLINE_VALUE_COLUMNS
+        """
+        kline_range = self._kline_range(currency_name, interval_name, start, end)
+        if kline_range is None:
+            return
+        condition, values = kline_range
+        query = '''SELECT {columns} FROM klines WHERE {condition} ORDER BY open_time;'''.format(
+            columns=",".join(KLINE_VALUE_COLUMNS), condition=condition)
+        try:
+            with self.reading() as db_conn:
+                cursor:sqlite3.Cursor = db_conn.cursor()
+                cursor.execute(query, values)
+                while True:
+                    with METRICS.timer("db.fetch"):
+                        rows = cursor.fetchmany(chunk_size)
+                    if len(rows) == 0:
+                        return
+                    # all the values fit exactly in float64, the int columns are cast back
+                    block = np.array(rows, dtype=np.float64)
+                    yield {c:block[:, i].astype(KLINE_DTYPES[c]) for i, c in enumerate(KLINE_VALUE_COLUMNS)}
+        except Error as e:
+            logger.error("SQLite execute select error: %s", e, extra={"query": query})
+
+    def read_kline_arrays(self, currency_name:str, interval_name:str, start=None, end=None) -> dict:
+        """Read the klines of a time range into preallocated typed NumPy columns
+        :return: dictionary with the NumPy column of each KLINE_VALUE_COLUMNS
+        """
+        arrays = {c:np.empty(0, dtype=KLINE_DTYPES[c]) for c in KLINE_VALUE_COLUMNS}
+        kline_range = self._kline_range(currency_name, interval_name, start, end)
+        if kline_range is None:
+            return arrays
+        condition, values = kline_range
+        try:
+            with self.reading() as db_conn:
+                total = db_conn.execute("SELECT COUNT(*) FROM klines WHERE {};".format(condition), values).fetchone()[0]
+        except Error as e:
+            logger.error("SQLite execute select error: %s", e)
+            return arrays
+        arrays = {c:np.empty(total, dtype=KLINE_DTYPES[c]) for c in KLINE_VALUE_COLUMNS}
+        i = 0
+        for chunk in self.iter_kline_arrays(currency_name, interval_name, start, end):
+            n = min(len(chunk["open_time"]), total - i)
+            for c in KLINE_VALUE_COLUMNS:
+                arrays[c][i:i + n] = chunk[c][:n]
+            i += n
+        return {c:v[:i] for c, v in arrays.items()}
+
+    def read_last_kline_arrays(self, currency_name:str, interval_name:str, count:int) -> dict:
+        """Read the last klines stored for a pair, in open_time order
+        :param count: max klines to read
+        :return: dictionary with the NumPy column of each KLINE_VALUE_COLUMNS
+        """
+        arrays = {c:np.empty(0, dtype=KLINE_DTYPES[c]) for c in KLINE_VALUE_COLUMNS}
+        kline_range = self._kline_range(currency_name, interval_name)
+        if kline_range is None or count <= 0:
+            return arrays
+        condition, values = kline_range
+        query = '''SELECT {columns} FROM klines WHERE {condition} ORDER BY open_time DESC LIMIT ?;'''.format(
+            columns=",".join(KLINE_VALUE_COLUMNS), condition=condition)
+        try:
+            with self.reading() as db_conn:
+                rows = db_conn.execute(query, values + [count]).fetchall()
+        except Error as e:
+            logger.error("SQLite execute select error: %s", e, extra={"query": query})
+            return arrays
+        if len(rows) == 0:
+            return arrays
+        block = np.array(rows[::-1], dtype=np.float64)
+        return {c:block[:, i].astype(KLINE_DTYPES[c]) for i, c in enumerate(KLINE_VALUE_COLUMNS)}
+
+    def read_open_times(self, currency_name:str, interval_name:str, start=None, end=None) -> np.ndarray:
+        """Read only the open times of a time range, served by the (currency_id, currency_interval_id, open_time) index
+        :return: sorted NumPy int64 array of epoch seconds
+        """
+        kline_range = self._kline_range(currency_name, interval_name, start, end)
+        if kline_range is None:
+            return np.empty(0, dtype=np.int64)
+        condition, values = kline_range
+        query = '''SELECT open_time FROM klines WHERE {condition} ORDER BY open_time;'''.format(condition=condition)
+        chunks = []
+        try:
+            with self.reading() as db_conn:
+                cursor:sqlite3.Cursor = db_conn.cursor()
+                cursor.execute(query, values)
+                while True:
+                    rows = cursor.fetchmany(self.KLINE_CHUNK_SIZE)
+                    if len(rows) == 0:
+                        break
+                    chunks.append(np.array(rows, dtype=np.int64).reshape(-1))
+        except Error as e:
+            logger.error("SQLite execute select error: %s", e, extra={"query": query})
+        return np.concatenate(chunks) if len(chunks) > 0 else np.empty(0, dtype=np.int64)
+
+    def read_klines(self, currency_name:str, interval_name:str, start=None, end=None):
+        """Read the klines of a time range as a DataFrame indexed by open_time, with the 
+        crossover.BINANCE_COLUMNS names (without the unused column)"""
+        return kline_arrays2frame(self.read_kline_arrays(currency_name, interval_name, start, end))
+
+    def iter_klines(self, currency_name:str, interval_name:str, start=None, end=None, 
+            chunk_size:int=KLINE_CHUNK_SIZE):
+        """Scan the klines of a time range with constant memory, one DataFrame by chunk"""
+        for chunk in self.iter_kline_arrays(currency_name, interval_name, start, end, chunk_size):
+            yield kline_arrays2frame(chunk)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Classical seasonal decomposition of many series at once and incrementally by observation
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+
+Same results as statsmodels.tsa.seasonal.seasonal_decompose (two sided moving average,
+no trend extrapolation), without the statsmodels dependency.
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+DECOMPOSITION_MODELS = ["additive", "multiplicative"]
+
+def trend_weights(period:int) -> np.ndarray:
+    """Weights of the centered moving average, a 2 x period average for the even periods"""
+    if period < 2:
+        raise ValueError("The seasonal period must be at least 2")
+    if period % 2 == 0:
+        weights = np.ones(period + 1)
+        weights[[0, -1]] = 0.5
+        return weights/period
+    return np.ones(period)/period
+
+def _check_model(model:str) -> None:
+    if model not in DECOMPOSITION_MODELS:
+        raise ValueError("Invalid model '{}', expected one of: {}".format(model, ", ".join(DECOMPOSITION_MODELS)))
+
+def seasonal_decompose_batch(series:np.ndarray, period:int, model:str="additive") -> dict:
+    """Decompose many equal length series in one NumPy pass
+    :param series: 2-D array (series, observations), a 1-D array is a single series
+    :param period: the seasonal period in observations, e.g. 1440 for the daily season of 1m klines
+    :param model: 'additive' (x = trend + seasonal + resid) or 'multiplicative' (x = trend*seasonal*resid)
+    :return: dictionary with the trend, seasonal and resid arrays of the series shape (NaN on the
+        period//2 edges without trend) and the seasonal indices (series, period)
+    """
+    _check_model(model)
+    series = np.asarray(series, dtype=np.float64)
+    values = np.atleast_2d(series)
+    count, length = values.shape
+    weights = trend_weights(period)
+    if length < 2*period:
+        raise ValueError("The series need at least two complete periods, {} observations".format(2*period))
+    half = len(weights)//2
+    trend = np.full(values.shape, np.nan)
+    trend[:, half:length - half] = sliding_window_view(values, len(weights), axis=1) @ weights
+    detrended = values - trend if model == "additive" else values/trend
+    # the mean by phase of the season, the phase of an observation is its position modulo the period
+    padded = np.full((count, -(-length//period)*period), np.nan)
+    padded[:, :length] = detrended
+    indices = np.nanmean(padded.reshape(count, -1, period), axis=1)
+    if model == "additive":
+        indices = indices - indices.mean(axis=1, keepdims=True)
+    else:
+        indices = indices/indices.mean(axis=1, keepdims=True)
+    seasonal = np.tile(indices, -(-length//period))[:, :length]
+    resid = detrended - seasonal if model == "additive" else values/seasonal/trend
+    shape = series.shape
+    return {
+        "trend": trend.reshape(shape),
+        "seasonal": seasonal.reshape(shape),
+        "resid": resid.reshape(shape),
+        "indices": indices if series.ndim > 1 else indices[0]
+    }
+
+class IncrementalDecomposition:
+    """Classical decomposition updated by observation in O(period). Keeps the last period + 1 observations
+    for the centered moving average and the sum and count of the detrended values of each season phase.
+    The trend of an observation is known period//2 observations later, each update returns the components
+    of that observation with the seasonal indices known so far. Once the whole series is fed the
+    seasonal_indices are the ones of seasonal_decompose_batch."""
+    def __init__(self, period:int, model:str="additive") -> None:
+        """
+        :param period: the seasonal period in observations
+        :param model: 'additive' or 'multiplicative'
+        """
+        _check_model(model)
+        self.period:int = period
+        self.model:str = model
+        self.weights:np.ndarray = trend_weights(period)
+        self.half:int = len(self.weights)//2
+        self.count:int = 0
+        self._window:deque = deque(maxlen=len(self.weights))
+        self._sums:np.ndarray = np.zeros(period)
+        self._counts:np.ndarray = np.zeros(period, dtype=np.int64)
+
+    def seasonal_indices(self) -> np.ndarray:
+        """The seasonal index of each phase, NaN for the phases without a detrended value yet"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self._sums/self._counts
+        known = self._counts > 0
+        if not known.any():
+            return means
+        if self.model == "additive":
+            return means - means[known].mean()
+        return means/means[known].mean()
+
+    def update(self, value:float):
+        """Add an observation
+        :return: None until the first trend is known, then a tuple with the position (0 based) of the
+            decomposed observation, its value, trend, seasonal and resid
+        """
+        self._window.append(float(value))
+        self.count += 1
+        if len(self._window) < len(self.weights):
+            return None
+        position = self.count - 1 - self.half
+        center = self._window[self.half]
+        trend = float(np.dot(self.weights, self._window))
+        detrended = center - trend if self.model == "additive" else center/trend
+        phase = position % self.period
+        self._sums[phase] += detrended
+        self._counts[phase] += 1
+        seasonal = float(self.seasonal_indices()[phase])
+        resid = detrended - seasonal if self.model == "additive" else center/seasonal/trend
+        return position, center, trend, seasonal, resid
+
+    def warm_up(self, values) -> list:
+        """Feed many observations
+        :return: the list of update results that are not None
+        """
+        return [r for r in (self.update(v) for v in values) if r is not None]
+
+def decompose_pairs(db_conn, pairs:list, period:int, length:int, column:str="close", model:str="additive") -> dict:
+    """Batch decomposition of the last klines of many stored (currency, interval) pairs
+    :param db_conn: the ts.db.Connection
+    :param pairs: list of (currency_name, interval_name) tuples
+    :param length: klines by pair, the pairs with fewer klines are skipped
+    :param column: the kline column decomposed
+    :return: dictionary by pair with the open_time, value, trend, seasonal and resid arrays
+    """
+    arrays = {pair:db_conn.read_last_kline_arrays(pair[0], pair[1], length) for pair in pairs}
+    arrays = {pair:a for pair, a in arrays.items() if len(a["open_time"]) == length}
+    if len(arrays) == 0:
+        return {}
+    values = np.vstack([a[column] for a in arrays.values()])
+    result = seasonal_decompose_batch(values, period, model)
+    return {pair:{"open_time": a["open_time"], "value": values[i], "trend": result["trend"][i],
+            "seasonal": result["seasonal"][i], "resid": result["resid"][i]}
+        for i, (pair, a) in enumerate(arrays.items())}
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rolling origin (walk-forward) evaluation of forecasters over many series
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .crossover import ma_matrix
+from .decomposition import seasonal_decompose_batch
+from .metrics import get_logger
+
+RESULTS_FILE = "results.jsonl"
+RESULT_COLUMNS = ["model", "series", "fold", "origin", "horizon", "mae", "rmse", "direction"]
+
+logger = get_logger("evaluation")
+
+def rolling_origin_folds(length:int, initial:int, horizon:int, step:int=None, window:int=None,
+        max_folds:int=None) -> list:
+    """Walk-forward folds of a series, each fold trains on the observations before its origin and
+    tests on the next horizon observations. The folds are slices, series[train] and series[test] are views.
+    :param length: observations of the series
+    :param initial: observations of the first train set
+    :param horizon: observations forecasted by fold
+    :param step: observations between consecutive origins, default to the horizon
+    :param window: max observations of the train sets (sliding window), None for expanding train sets
+    :param max_folds: keep only the last folds
+    :return: list of (train, test) slice tuples
+    """
+    step = step if step is not None else horizon
+    if initial < 1 or horizon < 1 or step < 1:
+        raise ValueError("The initial, horizon and step must be positive")
+    origins = range(initial, length - horizon + 1, step)
+    folds = [(slice(max(0, o - window) if window is not None else 0, o), slice(o, o + horizon)) for o in origins]
+    return folds[-max_folds:] if max_folds is not None else folds
+
+def forecast_naive(train:np.ndarray, horizon:int) -> np.ndarray:
+    """The last observation repeated"""
+    return np.full(horizon, train[-1])
+
+def forecast_moving_average(train:np.ndarray, horizon:int, window:int=20) -> np.ndarray:
+    """The mean of the last window observations repeated"""
+    return np.full(horizon, train[-window:].mean())
+
+def forecast_crossover(train:np.ndarray, horizon:int, fast:int=12, slow:int=26, kind:str="sma") -> np.ndarray:
+    """The last observation moved by the mean absolute change of the slow window, up while the fast
+    moving average is above the slow one and down otherwise"""
+    tail = train[-slow*4:]
+    averages = ma_matrix(tail, [fast, slow], kind)[:, -1]
+    direction = 1.0 if averages[0] > averages[1] else -1.0
+    drift = np.abs(np.diff(tail[-slow - 1:])).mean() if len(tail) > 1 else 0.0
+    return train[-1] + direction*drift*np.arange(1, horizon + 1)
+
+def forecast_seasonal(train:np.ndarray, horizon:int, period:int=24, model:str="additive") -> np.ndarray:
+    """Classical decomposition forecast: the last trend extended with the slope of its last period
+    plus the seasonal index of each forecasted phase"""
+    tail = train[-(len(train)//period)*period:] if len(train) >= 2*period else train
+    if len(tail) < 2*period:
+        return forecast_naive(train, horizon)
+    result = seasonal_decompose_batch(tail, period, model)
+    # the trend is known up to period//2 observations before the end of the train set
+    trend = result["trend"][~np.isnan(result["trend"])]
+    slope = (trend[-1] - trend[-1 - period])/period if len(trend) > period else 0.0
+    steps = period//2 + np.arange(1, horizon + 1)
+    phases = (len(tail) + np.arange(horizon)) % period
+    if model == "additive":
+        return trend[-1] + slope*steps + result["indices"][phases]
+    return (trend[-1] + slope*steps)*result["indices"][phases]
+
+FORECASTERS = {
+    "naive": forecast_naive,
+    "moving_average": forecast_moving_average,
+    "crossover": forecast_crossover,
+    "seasonal": forecast_seasonal,
+}
+
+def fold_scores(train:np.ndarray, test:np.ndarray, forecast:np.ndarray) -> dict:
+    """MAE, RMSE and directional accuracy (the forecast and the actual move the same way from the last
+    train observation) of a fold. The direction leaves out the steps where the forecast does not move,
+    it is NaN when the forecast never moves (e.g. the naive forecaster)."""
+    errors = forecast - test
+    forecast_sign = np.sign(forecast - train[-1])
+    moves = forecast_sign != 0
+    return {
+        "mae": float(np.abs(errors).mean()),
+        "rmse": float(np.sqrt((errors**2).mean())),
+        "direction": float((forecast_sign[moves] == np.sign(test[moves] - train[-1])).mean()) if moves.any() else np.nan
+    }
+
+def _evaluate_folds(series_file:str, series_name:str, model_name:str, forecaster:str, params:dict, folds:list) -> list:
+    """Process pool task: the scores of a model over some folds of a memory-mapped series"""
+    series = np.load(series_file, mmap_mode="r")
+    function = FORECASTERS[forecaster] if isinstance(forecaster, str) else forecaster
+    results = []
+    for fold, (train, test) in folds:
+        train_values, test_values = np.asarray(series[train]), np.asarray(series[test])
+        forecast = np.asarray(function(train_values, len(test_values), **(params or {})), dtype=np.float64)
+        results.append(dict(model=model_name, series=series_name, fold=fold, origin=test.start, horizon=len(test_values),
+            **fold_scores(train_values, test_values, forecast)))
+    return results
+
+class WalkForwardEvaluation:
+    """Score forecasters with rolling origin folds across many series. Each series is written once as
+    {work_dir}/series/{name}.npy and memory-mapped by the worker processes, the tasks only carry the fold
+    slices. The completed folds are appended to {work_dir}/results.jsonl and skipped when run again, the
+    model names identify the results so a model with other parameters needs another name."""
+    def __init__(self, work_dir:str) -> None:
+        """
+        :param work_dir: the directory of the series files and the results checkpoint
+        """
+        self.work_dir:str = work_dir
+        self.series:dict = {}
+        os.makedirs(os.path.join(work_dir, "series"), exist_ok=True)
+
+    def add_series(self, name:str, values) -> str:
+        """Store a series for the evaluation, an existing file with the same values is kept
+        :param name: the series name, e.g. BTC_1h_close
+        :return: the series file path
+        """
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        path = os.path.join(self.work_dir, "series", "{}.npy".format(name))
+        if not os.path.isfile(path) or not np.array_equal(np.load(path, mmap_mode="r"), values, equal_nan=True):
+            tmp_file = path + ".tmp"
+            with open(tmp_file, "wb") as file:
+                np.save(file, values)
+            os.replace(tmp_file, path)
+        self.series[name] = path
+        return path
+
+    def add_store_series(self, store, currency_name:str, interval_name:str, column:str="close") -> str:
+        """Add a kline column of a ts.store.KlineStore pair, named {currency}_{interval}_{column}"""
+        arrays = store.load(currency_name, interval_name, as_frame=False)
+        return self.add_series("{}_{}_{}".format(currency_name, interval_name, column), arrays[column])
+
+    def completed(self) -> pd.DataFrame:
+        """The results of the completed folds"""
+        path = os.path.join(self.work_dir, RESULTS_FILE)
+        if not os.path.isfile(path):
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        rows = []
+        with open(path) as file:
+            for line in file:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError: # a line cut by an interrupted run, its fold runs again
+                    continue
+        return pd.DataFrame(rows, columns=RESULT_COLUMNS).drop_duplicates(["model", "series", "origin", "horizon"], keep="last")
+
+    def run(self, models:dict, initial:int, horizon:int, step:int=None, window:int=None, max_folds:int=None,
+            fold_batch:int=64, processes:int=None) -> pd.DataFrame:
+        """Evaluate every (model, series, fold), only the folds not completed before
+        :param models: dictionary by model name of (forecaster, params) tuples, the forecaster is a FORECASTERS
+            name or a module level function forecaster(train, horizon, **params) -> forecast array
+        :param initial, horizon, step, window, max_folds: the folds, see rolling_origin_folds
+        :param fold_batch: folds by process pool task
+        :param processes: number of processes, None uses the CPU count and 1 runs in this process
+        :return: the results table of all the completed folds with model, series, fold, origin, horizon,
+            mae, rmse and direction columns
+        """
+        done = set(map(tuple, self.completed()[["model", "series", "origin", "horizon"]].values.tolist()))
+        tasks = []
+        for series_name, path in self.series.items():
+            folds = rolling_origin_folds(len(np.load(path, mmap_mode="r")), initial, horizon, step, window, max_folds)
+            for model_name, (forecaster, params) in models.items():
+                pending = [(i, f) for i, f in enumerate(folds)
+                    if (model_name, series_name, f[1].start, horizon) not in done]
+                for first in range(0, len(pending), fold_batch):
+                    tasks.append((path, series_name, model_name, forecaster, params, pending[first:first + fold_batch]))
+        logger.info("Walk-forward evaluation", extra={"tasks": len(tasks), "completed_folds": len(done)})
+        with open(os.path.join(self.work_dir, RESULTS_FILE), "a+") as checkpoint:
+            if checkpoint.tell() > 0:
+                checkpoint.seek(checkpoint.tell() - 1)
+                if checkpoint.read(1) != "\n": # end the line cut by an interrupted run
+                    checkpoint.write("\n")
+            def save(results:list) -> None:
+                checkpoint.write("".join(json.dumps(r) + "\n" for r in results))
+                checkpoint.flush()
+            if processes == 1 or len(tasks) <= 1:
+                for task in tasks:
+                    save(_evaluate_folds(*task))
+            else:
+                with ProcessPoolExecutor(max_workers=processes) as pool:
+                    for future in as_completed([pool.submit(_evaluate_folds, *task) for task in tasks]):
+                        save(future.result())
+        return self.completed().sort_values(["series", "model", "origin"], ignore_index=True)
+
+def summarize(results:pd.DataFrame) -> pd.DataFrame:
+    """Mean scores by series and model of a results table"""
+    return results.groupby(["series", "model"])[["mae", "rmse", "direction"]].mean().assign(
+        folds=results.groupby(["series", "model"]).size())
@@ -13,30 +13,37 @@ __maintainer__ = 'Jose Luis Bracamonte Amavizca'
 __email__ = 'luisjba@gmail.com'
 __status__ = 'Development'
 
-import os, sys
+import os, time
 from sqlite3.dbapi2 import Row
 from datetime import datetime
-from binance import Client, ThreadedWebsocketManager, ThreadedDepthCacheManager
 from .db import Connection
-from .utils import print_fail, print_okgreen, print_okblue, print_warning
+from .scheduler import SyncScheduler, TokenBucket
+from .live import BinanceKlineStream, LiveSync
+from .rollup import ROLLUP_SOURCE_INTERVAL, rollup_interval
+from .gaps import scan_gaps, backfill_gaps
+from .metrics import METRICS, SyncProfiler, get_logger
+from .utils import TSError
+
+logger = get_logger("exchangers")
 
 class Exchange:
+    # The binance.Client interval values, the binance package is only imported to build the default client
     KLINE_INTERVAL_LIST = [
-        Client.KLINE_INTERVAL_1MINUTE,
-        Client.KLINE_INTERVAL_3MINUTE,
-        Client.KLINE_INTERVAL_5MINUTE,
-        Client.KLINE_INTERVAL_15MINUTE,
-        Client.KLINE_INTERVAL_30MINUTE,
-        Client.KLINE_INTERVAL_1HOUR,
-        Client.KLINE_INTERVAL_2HOUR,
-        Client.KLINE_INTERVAL_4HOUR,
-        Client.KLINE_INTERVAL_6HOUR,
-        Client.KLINE_INTERVAL_8HOUR,
-        Client.KLINE_INTERVAL_12HOUR,
-        Client.KLINE_INTERVAL_1DAY,
-        Client.KLINE_INTERVAL_3DAY,
-        Client.KLINE_INTERVAL_1WEEK,
-        Client.KLINE_INTERVAL_1MONTH,
+        "1m", # Client.KLINE_INTERVAL_1MINUTE
+        "3m", # Client.KLINE_INTERVAL_3MINUTE
+        "5m", # Client.KLINE_INTERVAL_5MINUTE
+        "15m", # Client.KLINE_INTERVAL_15MINUTE
+        "30m", # Client.KLINE_INTERVAL_30MINUTE
+        "1h", # Client.KLINE_INTERVAL_1HOUR
+        "2h", # Client.KLINE_INTERVAL_2HOUR
+        "4h", # Client.KLINE_INTERVAL_4HOUR
+        "6h", # Client.KLINE_INTERVAL_6HOUR
+        "8h", # Client.KLINE_INTERVAL_8HOUR
+        "12h", # Client.KLINE_INTERVAL_12HOUR
+        "1d", # Client.KLINE_INTERVAL_1DAY
+        "3d", # Client.KLINE_INTERVAL_3DAY
+        "1w", # Client.KLINE_INTERVAL_1WEEK
+        "1M", # Client.KLINE_INTERVAL_1MONTH
     ]
     CURRENCIES = {
         "BTC" : "Bitcoin",
@@ -61,114 +68,322 @@ class Exchange:
         "taker_buy_base_asset_volume":      9,
         "taker_buy_quote_asset_volume":     10,
     }
-    def __init__(self, api_key:str, api_secret:str, base_path:str="") -> None:
-        """Constructor to create the client and db connection"""
+    KLINE_PAGE_LIMIT = 1000
+    # Binance weight of a klines request with limit 1000 and the weight limit by minute
+    KLINE_REQUEST_WEIGHT = 2
+    REQUEST_WEIGHT_PER_MINUTE = 1200
+    def __init__(self, api_key:str, api_secret:str, base_path:str="", db_file:str='data/data.db', client=None,
+            concurrent_reads:bool=False) -> None:
+        """Constructor to create the client and db connection
+        :param db_file: the SQLite DB file, relative to the base_path
+        :param client: the exchange client, default to a binance.Client (see ts.replay.ReplayClient for offline runs)
+        :param concurrent_reads: WAL mode with a read-only connection pool and the clustered klines table, 
+            to read while syncing (see Connection.enable_concurrent_reads)
+        """
         self._date_format:str = "%Y/%m/%d %H:%M:%S"
-        self.client:Client = Client(api_key, api_secret)
-        self.db_file:str = 'data/data.db'
+        if client is None:
+            from binance import Client
+            client = Client(api_key, api_secret)
+        self.client = client
+        self.db_file:str = db_file
         self.base_path:str = base_path
-        self.db_conn:Connection = Connection(self.base_path, db_file)
-        print_okgreen("SQLite connected to:{}".format(self.db_conn.db_file))
+        self.db_conn:Connection = Connection(self.base_path, self.db_file, concurrent_reads=concurrent_reads)
+        logger.info("SQLite connected", extra={"db_file": self.db_conn.db_file})
         self._init_db()
+        if concurrent_reads:
+            self.db_conn.migrate_klines_clustered()
 
     def _init_db(self):
         """Function to initialize the database"""
         schemas_dir='schemas'
         schemas_dir = os.path.join(self.base_path, schemas_dir) if not schemas_dir[0] == "/" else schemas_dir
         if not os.path.isdir(schemas_dir):
-            print_fail("'{}' is an invalid directory. Provide a valid directory to find the schemas for SQLite tables".format(schemas_dir))
-            sys.exit(1)
+            raise TSError("'{}' is an invalid directory. Provide a valid directory to find the schemas for SQLite tables".format(schemas_dir))
         schemas:list = ['currency', 'currency_interval', 'klines']
         schame_dict = {schema:"{}/{}.sql".format(schemas_dir, schema) for schema in schemas}
         if self.db_conn is not None and len(schame_dict) > 0:
             for table_name,table_file  in schame_dict.items():
                 if not os.path.isfile(table_file):
-                    print_fail("Schema file '{}' does not exists".format(table_file))
-                    sys.exit(1)
-                    continue
+                    raise TSError("Schema file '{}' does not exists".format(table_file))
                 result = self.db_conn.execute_query_fetch('sqlite_master',['name'],{'type':'table', 'name':table_name})
                 if len(result) > 0 : # The table already exists in the database
                     continue 
                 with open(table_file, 'r') as file:
                     if self.db_conn.create_table(file.read()):
-                        print_okgreen("Created the table {} into SQLite db: '{}'".format(table_name, self.db_conn.db_file))
+                        logger.info("Created the table %s", table_name, extra={"db_file": self.db_conn.db_file})
+
+    def kline2row(self, kline:list) -> tuple:
+        """Convert a Binance kline list into a row for Connection.insert_klines, 
+        the open and close times are stored in seconds"""
+        row = [kline[index] for index in self.KLINE_INDEX_MAP.values()]
+        for c in ["open_time", "close_time"]:
+            row[self.KLINE_INDEX_MAP[c]] = round(row[self.KLINE_INDEX_MAP[c]]/1000)
+        return tuple(row)
+
+    def get_or_create_currency(self, currency_name:str, description:str) -> Row:
+        """Get the currency row or store it into the DB if not exists"""
+        currency_row = self.db_conn.get_currency(currency_name)
+        if currency_row is None:
+            currency_row = self.db_conn.add_currency(
+                {
+                    "name":currency_name,
+                    "description": description
+                }
+            )
+            if currency_row is None:
+                raise TSError("Failed insert the currency row into SQLite db '{}'".format(currency_name))
+            logger.info("Currency inserted", extra={"currency": currency_name})
+        return currency_row
+
+    def get_or_create_currency_interval(self, currency_row:Row, interval_name:str) -> Row:
+        """Get the currency interval row or store it into the DB if not exists"""
+        currency_interval = self.db_conn.get_currency_interval(currency_row["id"], interval_name, cached=False)
+        if currency_interval is None:
+            currency_interval = self.db_conn.add_currency_interval(currency_row['id'],
+                {
+                    "currency_id": currency_row['id'],
+                    "name": interval_name,
+                    "first_transaction_date":0,
+                    "last_transaction_date":0
+                }
+            )
+            if currency_interval is None:
+                raise TSError("Failed insert the currency interval row into SQLite db '{}'".format(interval_name))
+            logger.info("Currency interval inserted", extra={"currency_id": currency_row["id"], "interval": interval_name})
+        return currency_interval
+
+    def iter_kline_pages(self, symbol:str, interval:str, start_time:int=0, limit:int=KLINE_PAGE_LIMIT, 
+            rate_limiter:TokenBucket=None, end_time:int=None):
+        """Iterate the klines from the Exchanger one page (request) at a time
+        :param symbol: the symbol name, e.g. BTCUSDT
+        :param interval: the kline interval
+        :param start_time: the open time in milliseconds of the first kline
+        :param limit: max klines by page, at most KLINE_PAGE_LIMIT
+        :param end_time: the open time in milliseconds of the last kline, None up to the latest
+        :param rate_limiter: optional rate limiter acquired with the request weight before each request
+        :return: generator of kline lists
+        """
+        # the exchange caps the pages, a larger limit would end the iteration after the first page
+        limit = min(limit, self.KLINE_PAGE_LIMIT)
+        while True:
+            if rate_limiter is not None:
+                rate_limiter.acquire(self.KLINE_REQUEST_WEIGHT)
+            params = {"endTime": end_time} if end_time is not None else {}
+            with METRICS.timer("api.page_fetch"):
+                klines = self.client.get_klines(symbol=symbol, interval=interval, startTime=start_time, limit=limit, **params)
+            METRICS.count("api.requests")
+            METRICS.count("api.klines", len(klines))
+            if len(klines) == 0:
+                return
+            yield klines
+            if len(klines) < limit:
+                return
+            start_time = klines[-1][0] + 1
+
+    def iter_kline_rows(self, currency_interval:Row, symbol:str, limit:int=KLINE_PAGE_LIMIT, 
+            rate_limiter:TokenBucket=None):
+        """Iterate the klines pages of a currency interval from its checkpoint, converted with kline2row.
+        The last stored kline is fetched again because it could have been stored before its close time.
+        :return: generator of row lists
+        """
+        start_time = currency_interval["last_transaction_date"]*1000
+        for page in self.iter_kline_pages(symbol, currency_interval["name"], start_time=start_time, 
+                limit=limit, rate_limiter=rate_limiter):
+            yield [self.kline2row(kline) for kline in page]
 
-    def sync_data(self,kline_intervals:list=[]) -> None:
-        """Synchronize klines data from the Exchanger on the different intervals"""
+    def store_kline_rows(self, currency_interval:Row, rows:list) -> tuple:
+        """Store a page of klines and advance the currency interval checkpoint in the same transaction
+        :return: tuple with the number of rows stored and the last open_time (0 if failed)
+        """
+        return self.db_conn.insert_klines(currency_interval["currency_id"], currency_interval["id"], 
+            currency_interval["name"], rows, on_conflict="replace", checkpoint=True)
+
+    def new_kline_count(self, currency_interval:Row, rows:list, stored:int) -> int:
+        """The klines of a stored page after the currency interval checkpoint, the kline at the
+        checkpoint is fetched again on resume (see iter_kline_rows) and it is only updated"""
+        checkpoint = currency_interval["last_transaction_date"]
+        return stored - 1 if len(rows) > 0 and checkpoint > 0 and rows[0][0] <= checkpoint else stored
+
+    def sync_data(self,kline_intervals:list=[], batch_size:int=1000, workers:int=1, 
+            rate_limiter:TokenBucket=None, rollup:bool=False, profile=None) -> dict:
+        """Synchronize klines data from the Exchanger on the different intervals
+        :param kline_intervals: the intervals to sync, all the KLINE_INTERVAL_LIST if empty
+        :param batch_size: number of klines by request, stored and checkpointed by transaction (max 1000)
+        :param workers: number of download threads, more than one runs the concurrent SyncScheduler
+        :param rate_limiter: rate limiter for the concurrent requests, default to REQUEST_WEIGHT_PER_MINUTE
+        :param rollup: download only the 1m klines and build the other intervals from them (see rollup_data)
+        :param profile: write the timing breakdown by phase at the end, True to log it or a file path or stream
+        :return: summary dictionary by (currency, interval) with status, klines, error and seconds
+        """
+        if not 1 <= batch_size <= self.KLINE_PAGE_LIMIT:
+            raise ValueError("Invalid batch size {}, expected 1 to {}".format(batch_size, self.KLINE_PAGE_LIMIT))
+        if profile:
+            with SyncProfiler(output=None if profile is True else profile):
+                return self.sync_data(kline_intervals, batch_size, workers, rate_limiter, rollup)
         if len(kline_intervals) <= 0 :
             # fill with the default intervals
             kline_intervals = self.KLINE_INTERVAL_LIST
-        for currency_name, description in self.CURRENCIES.items():
+        for interval_name in kline_intervals:
+            if interval_name not in  self.KLINE_INTERVAL_LIST:
+                logger.warning("Invalid kline interval %s", interval_name)
+        kline_intervals = [i for i in kline_intervals if i in self.KLINE_INTERVAL_LIST]
+        rollup_intervals = []
+        if rollup:
+            rollup_intervals = [i for i in kline_intervals if i != ROLLUP_SOURCE_INTERVAL]
+            kline_intervals = [ROLLUP_SOURCE_INTERVAL]
+        if workers > 1:
+            summary = self._sync_data_concurrent(kline_intervals, workers, rate_limiter, batch_size)
+        else:
+            summary = self._sync_data_serial(kline_intervals, batch_size)
+        if len(rollup_intervals) > 0:
+            summary.update(self.rollup_data(rollup_intervals, 
+                currencies=[c for c in self.CURRENCIES if summary[(c, ROLLUP_SOURCE_INTERVAL)]["status"] == "ok"]))
+        failed = [k for k,v in summary.items() if v["status"] != "ok"]
+        for currency_name, interval_name in failed:
+            logger.error("Sync failed: %s", summary[(currency_name, interval_name)]["error"],
+                extra={"currency": currency_name, "interval": interval_name})
+        logger.info("Finished synchronized all currencies", extra={"pairs_ok": len(summary) - len(failed),
+            "pairs_failed": len(failed), "klines": sum(v["klines"] for v in summary.values())})
+        return summary
+
+    def rollup_data(self, kline_intervals:list=[], currencies:list=None) -> dict:
+        """Build the klines of the intervals from the stored 1m klines instead of downloading them,
+        only the buckets since the last roll-up are computed again
+        :param kline_intervals: the intervals to build, all the KLINE_INTERVAL_LIST but 1m if empty
+        :param currencies: the currency names, all the CURRENCIES if None
+        :return: summary dictionary by (currency, interval) with status, klines, error and seconds
+        """
+        if len(kline_intervals) <= 0 :
+            kline_intervals = self.KLINE_INTERVAL_LIST
+        kline_intervals = [i for i in kline_intervals if i in self.KLINE_INTERVAL_LIST and i != ROLLUP_SOURCE_INTERVAL]
+        summary = {}
+        for currency_name in (currencies if currencies is not None else self.CURRENCIES.keys()):
+            currency_row = self.get_or_create_currency(currency_name, self.CURRENCIES.get(currency_name, currency_name))
+            source_interval = self.get_or_create_currency_interval(currency_row, ROLLUP_SOURCE_INTERVAL)
+            for interval_name in kline_intervals:
+                start = time.monotonic()
+                target_interval = self.get_or_create_currency_interval(currency_row, interval_name)
+                stored = rollup_interval(self.db_conn, currency_name, source_interval, target_interval)
+                summary[(currency_name, interval_name)] = {
+                    "status": "ok",
+                    "klines": stored,
+                    "error": None,
+                    "seconds": time.monotonic() - start
+                }
+            logger.info("Finished roll-up", extra={"currency": currency_name, "intervals": kline_intervals})
+        return summary
+
+    def backfill_data(self, kline_intervals:list=[], currencies:list=None, start:int=None, end:int=None,
+            rate_limiter:TokenBucket=None) -> dict:
+        """Find the missing klines of the stored pairs and fetch only those ranges from the Exchanger,
+        the pairs never synchronized are skipped
+        :param kline_intervals: the intervals to scan, all the KLINE_INTERVAL_LIST if empty
+        :param currencies: the currency names, all the CURRENCIES if None
+        :param start: expected first open time in epoch seconds, default to the first stored kline
+        :param end: expected last open time in epoch seconds, default to the last stored kline
+        :param rate_limiter: optional rate limiter acquired before each request
+        :return: summary dictionary by (currency, interval) with status, klines, error, seconds, the gaps
+            found before the backfill and the coverage report after it
+        """
+        if len(kline_intervals) <= 0 :
+            kline_intervals = self.KLINE_INTERVAL_LIST
+        kline_intervals = [i for i in kline_intervals if i in self.KLINE_INTERVAL_LIST]
+        summary = {}
+        for currency_name in (currencies if currencies is not None else self.CURRENCIES.keys()):
             currency_row = self.db_conn.get_currency(currency_name)
-            if currency_row is None:
-                currency_row = self.db_conn.add_currency(
-                    {
-                        "name":currency_name,
-                        "description": description
-                    }
-                )
-                if currency_row is None:
-                    print_fail("Failed insert the currency row into SQLite db '{}'".format(currency_name))
-                    sys.exit(1)
-                print_okgreen("Currency '{}' successfully inserted into SQLite db".format(currency_name))
-            
-            # Sync Kline data the current currency in different intervals
             for interval_name in kline_intervals:
-                if interval_name not in  self.KLINE_INTERVAL_LIST:
-                    print_warning("The interval coe '{}' is invalid".format(interval_name))
+                started = time.monotonic()
+                currency_interval = self.db_conn.get_currency_interval(currency_row["id"], interval_name) \
+                    if currency_row is not None else None
+                if currency_interval is None: # never synchronized
                     continue
-                currency_interval = self.db_conn.get_currency_interval(currency_row['id'], interval_name)
-                if currency_interval is None:
-                    currency_interval = self.db_conn.add_currency_interval(
-                        {
-                            "currency_id": currency_row['id'],
-                            "name": interval_name,
-                            "first_transaction_date":0,
-                            "last_transaction_date":0
-                        }
-                    )
-                    if currency_interval is None:
-                        print_fail("Failed insert the currency interval row into SQLite db '{}'".format(interval_name))
-                        sys.exit(1)
-                    print_okgreen("Currency Interval '{}' successfully inserted into SQLite db".format(interval_name))
-                # Klines sync
+                gaps = scan_gaps(self.db_conn, currency_name, interval_name, start, end)["gaps"]
+                stored, error = 0, None
+                try:
+                    stored = backfill_gaps(self, currency_interval, "{}USDT".format(currency_name), gaps, rate_limiter)
+                except Exception as e:
+                    error = str(e)
+                report = scan_gaps(self.db_conn, currency_name, interval_name, start, end)
+                summary[(currency_name, interval_name)] = {
+                    "status": "failed" if error is not None else "ok",
+                    "klines": stored,
+                    "error": error,
+                    "seconds": time.monotonic() - started,
+                    "gaps": gaps,
+                    "coverage": report
+                }
+                if len(gaps) > 0:
+                    logger.info("Gaps backfilled", extra={"currency": currency_name, "interval": interval_name,
+                        "gaps": len(gaps), "klines": stored, "coverage": report["coverage"]})
+                else:
+                    logger.info("No gaps", extra={"currency": currency_name, "interval": interval_name})
+        return summary
+
+    def _sync_data_concurrent(self, kline_intervals:list, workers:int, rate_limiter:TokenBucket=None,
+            batch_size:int=KLINE_PAGE_LIMIT) -> dict:
+        """Synchronize the (currency, interval) pairs concurrently with the SyncScheduler"""
+        if rate_limiter is None:
+            rate_limiter = TokenBucket.per_minute(self.REQUEST_WEIGHT_PER_MINUTE)
+        tasks = []
+        for currency_name, description in self.CURRENCIES.items():
+            currency_row = self.get_or_create_currency(currency_name, description)
+            for interval_name in kline_intervals:
+                currency_interval = self.get_or_create_currency_interval(currency_row, interval_name)
+                tasks.append({
+                    "key": (currency_name, interval_name),
+                    "symbol": "{}USDT".format(currency_name),
+                    "currency_interval": currency_interval
+                })
+        return SyncScheduler(self, workers=workers, rate_limiter=rate_limiter, batch_size=batch_size).run(tasks)
+
+    def _sync_data_serial(self, kline_intervals:list, batch_size:int) -> dict:
+        """Synchronize the (currency, interval) pairs one at a time"""
+        summary = {}
+        for currency_name, description in self.CURRENCIES.items():
+            currency_row = self.get_or_create_currency(currency_name, description)
+            # Sync Kline data the current currency in different intervals
+            for interval_name in kline_intervals:
+                start = time.monotonic()
+                currency_interval = self.get_or_create_currency_interval(currency_row, interval_name)
+                # Klines sync, one page in memory, stored and checkpointed by transaction
                 kline_total = 0
-                last_kline = None
-                for kline in self.client.get_historical_klines(
-                        symbol="{}USDT".format(currency_name), 
-                        interval=interval_name, 
-                        start_str=currency_interval["last_transaction_date"]
-                    ):
-                    kline_data = {
-                        "currency_id" : currency_row['id'],
-                        "currency_interval_id" : currency_interval['id'],
-                        "interval_name": interval_name
-                    }
-                    for column, index in self.KLINE_INDEX_MAP.items():
-                        kline_data[column] = kline[index]
-                    # Format the date time
-                    date_columns = ["open_time", "close_time"]
-                    for c in date_columns:
-                        kline_data[c] = round(kline_data[c]/1000)
-                    # Store kline in the DB
-                    kline_row = self.db_conn.add_kline(currency_row['id'], currency_interval['id'], kline_data)
-                    if kline_row is None:
-                        print_fail("Failed insert the kline '{}' into SQLite db".format(kline_data))
+                error = None
+                for rows in self.iter_kline_rows(currency_interval, "{}USDT".format(currency_name), limit=batch_size):
+                    stored, last_open_time = self.store_kline_rows(currency_interval, rows)
+                    if last_open_time == 0:
+                        error = "Failed insert the klines batch from '{}'".format(rows[0][0])
                         break
-                    last_kline = kline_row
-                    kline_total += 1
+                    kline_total += self.new_kline_count(currency_interval, rows, stored)
                 if kline_total >= 1:
-                    if last_kline is not None:
-                        # Update Interval data
-                        if currency_interval["first_transaction_date"] <= 0:
-                            currency_interval["first_transaction_date"] = last_kline["open_time"]
-                        currency_interval["last_transaction_date"] = last_kline["open_time"]
-                        currency_interval = self.db_conn.update_currency_interval(currency_interval)
-                        if currency_interval is None:
-                            print_fail("Failed updating the kline interval '{}' into SQLite db".format(currency_interval))
-                    print_okgreen("{} {} interval, {} records added synchronized.".format(currency_name, currency_interval["name"], kline_total))
+                    logger.info("Interval synchronized", extra={"currency": currency_name, "interval": interval_name, "klines": kline_total})
                 else:
-                    print_okblue("{} {} interval is up to date.".format(currency_name, currency_interval["name"]))
-            print_okblue("Finished synchronized {} intervals: ''.".format(currency_name, kline_intervals))
-        print_okblue("Finished synchronized all currencies")
+                    logger.info("Interval up to date", extra={"currency": currency_name, "interval": interval_name})
+                summary[(currency_name, interval_name)] = {
+                    "status": "failed" if error is not None else "ok",
+                    "klines": kline_total,
+                    "error": error,
+                    "seconds": time.monotonic() - start
+                }
+                METRICS.rows(("{}USDT".format(currency_name), interval_name), kline_total, 
+                    summary[(currency_name, interval_name)]["seconds"])
+            logger.info("Finished synchronized currency", extra={"currency": currency_name, "intervals": kline_intervals})
+        return summary
 
+    def live(self, kline_intervals:list=[], stream=None, batch_size:int=100, flush_seconds:float=5.0,
+            crossovers:list=[(12, 26, "ema")], on_signal=None, duration:float=None) -> dict:
+        """Store the closed klines from the websocket kline streams while keeping the crossover indicators updated
+        :param kline_intervals: the intervals to subscribe, all the KLINE_INTERVAL_LIST if empty
+        :param stream: the stream source, default to the Binance websocket (see ts.live.ReplayKlineStream for offline runs)
+        :param batch_size: max closed klines buffered before a write
+        :param flush_seconds: max seconds a closed kline waits before a write
+        :param crossovers: list of (fast, slow, kind) crossover indicators by pair
+        :param on_signal: callback(currency_name, interval_name, state, signal, open_time) on each position change
+        :param duration: max seconds to run, None to run until the stream ends
+        :return: summary dictionary by (currency, interval) with the klines stored and signals
+        """
+        if len(kline_intervals) <= 0 :
+            kline_intervals = self.KLINE_INTERVAL_LIST
+        if stream is None:
+            stream = BinanceKlineStream()
+        return LiveSync(self, stream, [i for i in kline_intervals if i in self.KLINE_INTERVAL_LIST], batch_size=batch_size,
+            flush_seconds=flush_seconds, crossovers=crossovers, on_signal=on_signal).run(duration)
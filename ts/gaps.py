@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gap detection and targeted backfill of the stored klines
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+from sqlite3 import Row
+import numpy as np
+from .db import Connection
+from .rollup import WEEK_OFFSET
+from .utils import KLINE_INTERVAL_SECONDS, TSError
+
+def interval_slots(open_times:np.ndarray, interval_name:str) -> np.ndarray:
+    """Position of each open time (epoch seconds) in the sequence of the interval klines,
+    consecutive klines have consecutive slots. The months (1M) are counted from 1970-01."""
+    open_times = np.asarray(open_times, dtype=np.int64)
+    if interval_name == "1M":
+        return open_times.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+    if interval_name not in KLINE_INTERVAL_SECONDS:
+        raise ValueError("Invalid kline interval '{}'".format(interval_name))
+    offset = WEEK_OFFSET if interval_name == "1w" else 0
+    return (open_times - offset)//KLINE_INTERVAL_SECONDS[interval_name]
+
+def slot_open_times(slots:np.ndarray, interval_name:str) -> np.ndarray:
+    """Open time (epoch seconds) of each interval slot, inverse of interval_slots"""
+    slots = np.asarray(slots, dtype=np.int64)
+    if interval_name == "1M":
+        return slots.astype("datetime64[M]").astype("datetime64[s]").astype(np.int64)
+    offset = WEEK_OFFSET if interval_name == "1w" else 0
+    return slots*KLINE_INTERVAL_SECONDS[interval_name] + offset
+
+def find_gaps(open_times:np.ndarray, interval_name:str, start:int=None, end:int=None) -> list:
+    """Find the missing klines of a sorted open time array in one vectorized pass. The consecutive
+    missing klines are merged, so the result is the minimal list of ranges to fetch.
+    :param open_times: sorted open times in epoch seconds
+    :param interval_name: the kline interval
+    :param start: expected first open time, default to the first open time
+    :param end: expected last open time, default to the last open time
+    :return: list of (first, last) open times in epoch seconds of each missing range, both included
+    """
+    slots = np.unique(interval_slots(open_times, interval_name))
+    if start is not None:
+        first = interval_slots([start], interval_name)[0]
+        slots = np.concatenate([[first - 1], slots[slots >= first]])
+    if end is not None:
+        last = interval_slots([end], interval_name)[0]
+        slots = np.concatenate([slots[slots <= last], [last + 1]])
+    if len(slots) < 2:
+        return []
+    holes = np.flatnonzero(np.diff(slots) > 1)
+    firsts = slot_open_times(slots[holes] + 1, interval_name)
+    lasts = slot_open_times(slots[holes + 1] - 1, interval_name)
+    return list(zip(firsts.tolist(), lasts.tolist()))
+
+def gap_report(open_times:np.ndarray, interval_name:str, start:int=None, end:int=None) -> dict:
+    """Coverage of the expected klines between the start and end (default the stored range)
+    :return: dictionary with the klines stored, expected, missing, coverage ratio and the gaps list
+    """
+    open_times = np.asarray(open_times, dtype=np.int64)
+    if len(open_times) == 0 and (start is None or end is None):
+        return {"klines": 0, "expected": 0, "missing": 0, "coverage": 0.0, "gaps": []}
+    first = start if start is not None else int(open_times[0])
+    last = end if end is not None else int(open_times[-1])
+    first_slot, last_slot = interval_slots([first, last], interval_name)
+    slots = np.unique(interval_slots(open_times, interval_name))
+    stored = int(np.count_nonzero((slots >= first_slot) & (slots <= last_slot)))
+    expected = max(0, int(last_slot - first_slot + 1))
+    return {
+        "klines": stored,
+        "expected": expected,
+        "missing": expected - stored,
+        "coverage": stored/expected if expected > 0 else 0.0,
+        "gaps": find_gaps(open_times, interval_name, start, end)
+    }
+
+def scan_gaps(db_conn:Connection, currency_name:str, interval_name:str, start:int=None, end:int=None) -> dict:
+    """Gap report of a stored pair, only the open_time index is read
+    :param start: expected first open time in epoch seconds, default to the first stored kline
+    :param end: expected last open time in epoch seconds, default to the last stored kline
+    """
+    return gap_report(db_conn.read_open_times(currency_name, interval_name, start, end), interval_name, start, end)
+
+def backfill_gaps(exchange, currency_interval:Row, symbol:str, gaps:list, rate_limiter=None) -> int:
+    """Fetch only the missing ranges from the exchange, each page stored with its checkpoint in one transaction
+    :param exchange: the ts.exchangers.Exchange
+    :param currency_interval: the currency interval row
+    :param symbol: the symbol name, e.g. BTCUSDT
+    :param gaps: list of (first, last) open times in epoch seconds, see find_gaps
+    :param rate_limiter: optional rate limiter acquired before each request
+    :return: the number of klines stored
+    """
+    total = 0
+    for first, last in gaps:
+        for page in exchange.iter_kline_pages(symbol, currency_interval["name"], start_time=first*1000,
+                end_time=last*1000, rate_limiter=rate_limiter):
+            stored, last_open_time = exchange.store_kline_rows(currency_interval, [exchange.kline2row(k) for k in page])
+            if last_open_time == 0:
+                raise TSError("Failed insert the klines batch from '{}'".format(page[0][0]))
+            total += stored
+    return total
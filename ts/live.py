@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Live klines ingestion from websocket streams
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import time
+import queue
+import threading
+from .crossover import CrossoverState
+from .metrics import METRICS, get_logger
+
+logger = get_logger("live")
+
+def kline_event2kline(event:dict) -> list:
+    """Convert the 'k' payload of a websocket kline event into a kline list like the REST klines"""
+    return [event["t"], event["o"], event["h"], event["l"], event["c"], event["v"], event["T"],
+        event["q"], event["n"], event["V"], event["Q"], event.get("B", "0")]
+
+def kline2message(symbol:str, interval:str, kline:list, closed:bool=True) -> dict:
+    """Build a multiplex websocket kline message from a REST kline list, used by local stream sources"""
+    return {
+        "stream": kline_stream_name(symbol, interval),
+        "data": {
+            "e": "kline", "E": kline[6], "s": symbol,
+            "k": {
+                "t": kline[0], "T": kline[6], "s": symbol, "i": interval, "o": kline[1], "h": kline[2],
+                "l": kline[3], "c": kline[4], "v": kline[5], "n": kline[8], "x": closed, "q": kline[7],
+                "V": kline[9], "Q": kline[10], "B": kline[11] if len(kline) > 11 else "0"
+            }
+        }
+    }
+
+def kline_stream_name(symbol:str, interval:str) -> str:
+    """The Binance stream name of a symbol kline interval, e.g. btcusdt@kline_1m"""
+    return "{}@kline_{}".format(symbol.lower(), interval)
+
+class BinanceKlineStream:
+    """Kline streams from Binance through the python-binance ThreadedWebsocketManager"""
+    def __init__(self, api_key:str=None, api_secret:str=None) -> None:
+        self.api_key:str = api_key
+        self.api_secret:str = api_secret
+        self._twm = None
+
+    def start(self, streams:list, callback) -> None:
+        """Subscribe to the streams, the callback receives each multiplex message"""
+        from binance import ThreadedWebsocketManager
+        self._twm = ThreadedWebsocketManager(api_key=self.api_key, api_secret=self.api_secret)
+        self._twm.start()
+        self._twm.start_multiplex_socket(callback=callback, streams=streams)
+
+    def stop(self) -> None:
+        if self._twm is not None:
+            self._twm.stop()
+            self._twm = None
+
+class ReplayKlineStream:
+    """Local stream source that plays a list of multiplex messages from a thread, for offline runs.
+    The callback receives None once all the messages were played."""
+    def __init__(self, messages:list, delay:float=0.0) -> None:
+        """
+        :param messages: the multiplex messages, see kline2message
+        :param delay: seconds between messages
+        """
+        self.messages:list = messages
+        self.delay:float = delay
+        self._stop = threading.Event()
+        self._thread:threading.Thread = None
+
+    def _play(self, streams:set, callback) -> None:
+        for message in self.messages:
+            if self._stop.is_set():
+                return
+            if message.get("stream") in streams:
+                callback(message)
+            if self.delay > 0:
+                time.sleep(self.delay)
+        callback(None)
+
+    def start(self, streams:list, callback) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._play, args=(set(streams), callback), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+class LiveSync:
+    """Store the closed klines of the streams in micro batches and keep the crossover
+    indicators updated in O(1) per closed kline. The stream callback only queues the
+    messages, the SQLite writes and indicators run in the thread calling run."""
+    def __init__(self, exchange, stream, kline_intervals:list, batch_size:int=100, flush_seconds:float=5.0,
+            crossovers:list=[(12, 26, "ema")], on_signal=None) -> None:
+        """
+        :param exchange: the ts.exchangers.Exchange with the DB connection
+        :param stream: the stream source, with start(streams, callback) and stop()
+        :param kline_intervals: the intervals to subscribe for every Exchange.CURRENCIES
+        :param batch_size: max closed klines buffered before a write
+        :param flush_seconds: max seconds a closed kline waits before a write
+        :param crossovers: list of (fast, slow, kind) crossover indicators by pair
+        :param on_signal: callback(currency_name, interval_name, state, signal, open_time) on each position change
+        """
+        self.exchange = exchange
+        self.stream = stream
+        self.batch_size:int = batch_size
+        self.flush_seconds:float = flush_seconds
+        self.on_signal = on_signal
+        self._queue:queue.Queue = queue.Queue()
+        self.pairs:dict = {}
+        for currency_name, description in exchange.CURRENCIES.items():
+            currency_row = exchange.get_or_create_currency(currency_name, description)
+            for interval_name in kline_intervals:
+                currency_interval = exchange.get_or_create_currency_interval(currency_row, interval_name)
+                symbol = "{}USDT".format(currency_name)
+                self.pairs[kline_stream_name(symbol, interval_name)] = self._init_pair(
+                    currency_name, currency_interval, crossovers)
+
+    def _init_pair(self, currency_name:str, currency_interval, crossovers:list) -> dict:
+        """Build the state of a pair, the indicators are warmed up with the closed klines in the DB"""
+        indicators = [CrossoverState(fast, slow, kind) for fast, slow, kind in crossovers]
+        history = self.exchange.db_conn.read_last_kline_arrays(currency_name, currency_interval["name"],
+            max([slow for _, slow, _ in crossovers] + [0]))
+        closed = history["close_time"] < time.time()
+        for indicator in indicators:
+            indicator.warm_up(history["close"][closed])
+        return {
+            "currency_name": currency_name,
+            "currency_interval": currency_interval,
+            "indicators": indicators,
+            "last_open_time": int(history["open_time"][closed][-1]) if closed.any() else 0,
+            "buffer": [],
+            "klines": 0,
+            "signals": 0
+        }
+
+    def _on_kline(self, pair:dict, event:dict) -> None:
+        """Buffer a closed kline and update the pair indicators"""
+        row = self.exchange.kline2row(kline_event2kline(event))
+        if row[0] <= pair["last_open_time"]: # already stored
+            return
+        pair["last_open_time"] = row[0]
+        pair["buffer"].append(row)
+        close = float(row[4])
+        for indicator in pair["indicators"]:
+            signal = indicator.update(close)
+            if signal != 0:
+                pair["signals"] += 1
+                if self.on_signal is not None:
+                    self.on_signal(pair["currency_name"], pair["currency_interval"]["name"], indicator, signal, row[0])
+
+    def flush(self) -> int:
+        """Store the buffered klines of every pair, each pair with its checkpoint in one transaction.
+        The klines of a failed transaction stay in the buffer for the next flush.
+        :return: the number of klines stored
+        """
+        total = 0
+        for pair in self.pairs.values():
+            if len(pair["buffer"]) == 0:
+                continue
+            stored, last_open_time = self.exchange.store_kline_rows(pair["currency_interval"], pair["buffer"])
+            if last_open_time == 0:
+                METRICS.count("live.flush_errors")
+                logger.error("Failed insert the live klines batch, kept for the next flush", extra={
+                    "currency": pair["currency_name"], "interval": pair["currency_interval"]["name"],
+                    "buffered": len(pair["buffer"])})
+                continue
+            pair["klines"] += stored
+            pair["buffer"] = []
+            total += stored
+        return total
+
+    def run(self, duration:float=None) -> dict:
+        """Consume the streams until they end, the duration expires or a KeyboardInterrupt
+        :param duration: max seconds to run, None to run until the stream ends
+        :return: summary dictionary by (currency, interval) with the klines stored and signals
+        """
+        deadline = time.monotonic() + duration if duration is not None else None
+        buffered, last_flush = 0, time.monotonic()
+        self.stream.start(list(self.pairs.keys()), self._queue.put)
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                try:
+                    message = self._queue.get(timeout=min(1.0, self.flush_seconds))
+                except queue.Empty:
+                    message = False
+                if message is None: # end of the stream
+                    break
+                if message:
+                    data = message.get("data", message)
+                    if data.get("e") == "error":
+                        logger.warning("Kline stream error: %s", data.get("m"))
+                    elif data.get("e") == "kline" and data["k"]["x"]:
+                        pair = self.pairs.get(message.get("stream", kline_stream_name(data["s"], data["k"]["i"])))
+                        if pair is not None:
+                            self._on_kline(pair, data["k"])
+                            buffered += 1
+                if buffered >= self.batch_size or (buffered > 0 and time.monotonic() - last_flush >= self.flush_seconds):
+                    self.flush()
+                    buffered, last_flush = 0, time.monotonic()
+        except KeyboardInterrupt:
+            logger.warning("Live sync interrupted")
+        finally:
+            self.stream.stop()
+            self.flush()
+        summary = {(p["currency_name"], p["currency_interval"]["name"]):{"klines":p["klines"], "signals":p["signals"]}
+            for p in self.pairs.values()}
+        unstored = sum(len(p["buffer"]) for p in self.pairs.values())
+        if unstored > 0:
+            logger.error("Live klines not stored", extra={"klines": unstored})
+        logger.info("Finished live sync", extra={"klines": sum(v["klines"] for v in summary.values()),
+            "signals": sum(v["signals"] for v in summary.values())})
+        return summary
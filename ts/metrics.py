@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Metrics, latency histograms and structured logging of the sync and DB hot paths
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import sys
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LOGGER_NAME = "ts"
+# Upper bounds in seconds of the latency histogram buckets, from 10us doubling up to ~84s
+LATENCY_BUCKETS = [1e-5*2**i for i in range(24)]
+# The attributes of every LogRecord, the others come from the extra fields of the call
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+def get_logger(name:str=None) -> logging.Logger:
+    """The logger of a ts module, e.g. get_logger('db') is the 'ts.db' logger"""
+    return logging.getLogger("{}.{}".format(LOGGER_NAME, name) if name else LOGGER_NAME)
+
+class KeyValueFormatter(logging.Formatter):
+    """One line by record: time, level, logger and message followed by the extra fields as key=value"""
+    def format(self, record:logging.LogRecord) -> str:
+        fields = {k:v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES}
+        line = "{} {:<7} {} {}".format(self.formatTime(record), record.levelname, record.name, record.getMessage())
+        if len(fields) > 0:
+            line += " " + " ".join("{}={}".format(k, json.dumps(v, default=str)) for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+def configure_logging(level=logging.INFO, stream=None) -> logging.Logger:
+    """Send the ts logs to a stream (stderr by default) in key=value lines. Without it only
+    the warnings and errors are shown, use level=logging.CRITICAL + 1 to turn all off."""
+    logger = get_logger()
+    logger.setLevel(level)
+    for handler in [h for h in logger.handlers if getattr(h, "_ts_handler", False)]:
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(KeyValueFormatter())
+    handler._ts_handler = True
+    logger.addHandler(handler)
+    return logger
+
+class Histogram:
+    """Latency histogram with fixed exponential buckets, O(log buckets) by observation"""
+    def __init__(self, buckets:list=LATENCY_BUCKETS) -> None:
+        self.buckets:list = buckets
+        self.counts:list = [0]*(len(buckets) + 1)
+        self.count:int = 0
+        self.sum:float = 0.0
+        self.max:float = 0.0
+
+    def observe(self, value:float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q:float) -> float:
+        """Upper bound of the bucket holding the q quantile"""
+        if self.count == 0:
+            return 0.0
+        rank, seen = q*self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n > 0:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum/self.count if self.count > 0 else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "counts": list(self.counts)
+        }
+
+class Metrics:
+    """Thread safe registry of counters, latency histograms and rows/sec by pair.
+    Disabled, every call returns at once."""
+    def __init__(self, enabled:bool=True) -> None:
+        self.enabled:bool = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters:dict = {}
+            self.histograms:dict = {}
+            self.pairs:dict = {}
+
+    def count(self, name:str, value:int=1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name:str, seconds:float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name:str):
+        """Measure the latency of the block into the name histogram"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def rows(self, key:tuple, rows:int, seconds:float) -> None:
+        """Add the rows stored for a (symbol, interval) pair and the seconds it took"""
+        if not self.enabled:
+            return
+        with self._lock:
+            pair = self.pairs.setdefault(key, {"rows": 0, "seconds": 0.0})
+            pair["rows"] += rows
+            pair["seconds"] += seconds
+
+    def snapshot(self) -> dict:
+        """Copy of the current values, the pairs include their rows/sec"""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {k:h.to_dict() for k, h in self.histograms.items()},
+                "pairs": {k:dict(v, rows_per_sec=v["rows"]/v["seconds"] if v["seconds"] > 0 else 0.0)
+                    for k, v in self.pairs.items()}
+            }
+
+METRICS = Metrics()
+
+def phase_breakdown(before:dict, after:dict, elapsed:float) -> list:
+    """Timing of each histogram phase between two snapshots
+    :return: list of dictionaries with phase, count, seconds, mean, share of the elapsed time and p95, slowest first.
+        The phases of concurrent threads overlap, their shares can add up to more than 100%
+    """
+    phases = []
+    for name, h in after["histograms"].items():
+        b = before["histograms"].get(name, {"count": 0, "sum": 0.0, "counts": [0]*len(h["counts"])})
+        count, seconds = h["count"] - b["count"], h["sum"] - b["sum"]
+        if count <= 0:
+            continue
+        delta = Histogram()
+        delta.counts = [x - y for x, y in zip(h["counts"], b["counts"])]
+        delta.count, delta.max = count, h["max"]
+        phases.append({"phase": name, "count": count, "seconds": seconds, "mean": seconds/count,
+            "share": seconds/elapsed if elapsed > 0 else 0.0, "p95": delta.quantile(0.95)})
+    return sorted(phases, key=lambda p: p["seconds"], reverse=True)
+
+class SyncProfiler:
+    """Profiling hook of Exchange.sync_data, writes the per phase timing breakdown of the run"""
+    def __init__(self, metrics:Metrics=METRICS, output=None) -> None:
+        """
+        :param metrics: the metrics registry of the hot paths
+        :param output: file path or stream of the breakdown, None to log it
+        """
+        self.metrics:Metrics = metrics
+        self.output = output
+        self.breakdown:list = []
+
+    def __enter__(self):
+        self._before = self.metrics.snapshot()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self._start
+        self.breakdown = phase_breakdown(self._before, self.metrics.snapshot(), elapsed)
+        lines = ["sync_data profile: {:.3f}s".format(elapsed),
+            "{:<20} {:>8} {:>10} {:>10} {:>10} {:>7}".format("phase", "count", "seconds", "mean", "p95", "share")]
+        lines += ["{:<20} {:>8} {:>10.4f} {:>10.6f} {:>10.6f} {:>6.1%}".format(
+            p["phase"], p["count"], p["seconds"], p["mean"], p["p95"], p["share"]) for p in self.breakdown]
+        if self.output is None:
+            get_logger("profile").info("\n".join(lines), extra={"elapsed": elapsed})
+        elif isinstance(self.output, str):
+            with open(self.output, "w") as file:
+                file.write("\n".join(lines) + "\n")
+        else:
+            self.output.write("\n".join(lines) + "\n")
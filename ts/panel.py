@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Aligned multi currency panels: dense time x currency matrices of the kline fields
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import os
+import json
+import numpy as np
+from .db import Connection, KLINE_VALUE_COLUMNS
+from .gaps import interval_slots, slot_open_times
+from .metrics import METRICS, get_logger
+
+PANEL_FIELDS = ["close", "volume"]
+MANIFEST_FILE = "manifest.json"
+
+logger = get_logger("panel")
+
+class PanelBuilder:
+    """Build the (time x currency) matrices of an interval for many currencies in a single pass over the
+    klines index, the missing klines are NaN. The panels are cached keyed on the last_transaction_date
+    of each pair, a rebuild only reads the klines from the oldest pair checkpoint and appends the new rows.
+    The gaps backfilled before a checkpoint do not change it, use build(..., full=True) after a backfill."""
+    def __init__(self, db_conn:Connection, currencies:list, fields:list=PANEL_FIELDS, cache_dir:str=None) -> None:
+        """
+        :param db_conn: the DB connection
+        :param currencies: the currency names, the columns of the matrices in this order
+        :param fields: the kline fields of the panels, e.g. close and volume
+        :param cache_dir: directory to keep the panels between runs ({cache_dir}/{interval}/{field}.npy),
+            None keeps them only in memory
+        """
+        invalid = [f for f in fields if f not in KLINE_VALUE_COLUMNS or f == "open_time"]
+        if len(invalid) > 0:
+            raise ValueError("Invalid panel fields: {}".format(", ".join(invalid)))
+        self.db_conn:Connection = db_conn
+        self.currencies:list = list(currencies)
+        self.fields:list = list(fields)
+        self.cache_dir:str = cache_dir
+        self._panels:dict = {}
+
+    def _pairs(self, interval_name:str) -> dict:
+        """The currency interval row of each currency with klines, by currency name"""
+        pairs = {}
+        for currency_name in self.currencies:
+            currency = self.db_conn.get_currency(currency_name)
+            # the checkpoint keys the cached panel, read it from the DB
+            currency_interval = self.db_conn.get_currency_interval(currency["id"], interval_name, cached=False) \
+                if currency is not None else None
+            if currency_interval is not None and currency_interval["last_transaction_date"] > 0:
+                pairs[currency_name] = currency_interval
+        return pairs
+
+    def _empty(self) -> dict:
+        return {"open_time": np.empty(0, dtype=np.int64), "checkpoints": {},
+            "fields": {f:np.empty((0, len(self.currencies))) for f in self.fields}}
+
+    def _cache_path(self, interval_name:str) -> str:
+        return os.path.join(self.cache_dir, interval_name)
+
+    def _load(self, interval_name:str) -> dict:
+        """The cached panel of the interval from memory or the cache directory, None if not cached"""
+        panel = self._panels.get(interval_name)
+        if panel is not None or self.cache_dir is None:
+            return panel
+        manifest_file = os.path.join(self._cache_path(interval_name), MANIFEST_FILE)
+        if not os.path.isfile(manifest_file):
+            return None
+        with open(manifest_file) as file:
+            manifest = json.load(file)
+        if manifest["currencies"] != self.currencies or not set(self.fields) <= set(manifest["fields"]):
+            return None
+        path = self._cache_path(interval_name)
+        return {"open_time": np.load(os.path.join(path, "open_time.npy")), "checkpoints": manifest["checkpoints"],
+            "fields": {f:np.load(os.path.join(path, "{}.npy".format(f))) for f in self.fields}}
+
+    def _save(self, interval_name:str, panel:dict) -> None:
+        """Store the panel files, each file replaced atomically and the manifest the last"""
+        path = self._cache_path(interval_name)
+        os.makedirs(path, exist_ok=True)
+        arrays = dict(panel["fields"], open_time=panel["open_time"])
+        for name, array in arrays.items():
+            tmp_file = os.path.join(path, "{}.npy.tmp".format(name))
+            with open(tmp_file, "wb") as file:
+                np.save(file, array)
+            os.replace(tmp_file, os.path.join(path, "{}.npy".format(name)))
+        tmp_file = os.path.join(path, MANIFEST_FILE + ".tmp")
+        with open(tmp_file, "w") as file:
+            json.dump({"currencies": self.currencies, "fields": self.fields, "checkpoints": panel["checkpoints"]},
+                file, indent=2, sort_keys=True)
+        os.replace(tmp_file, os.path.join(path, MANIFEST_FILE))
+
+    def build(self, interval_name:str, full:bool=False) -> dict:
+        """The panel of an interval, only the klines after the cached checkpoints are read
+        :param interval_name: the kline interval
+        :param full: ignore the cache and read all the klines again
+        :return: dictionary with the open_time array (one row by interval, no gaps), the currencies
+            list and the (time x currency) matrix of each field
+        """
+        pairs = self._pairs(interval_name)
+        checkpoints = {c:int(p["last_transaction_date"]) for c, p in pairs.items()}
+        panel = None if full else self._load(interval_name)
+        if panel is None or any(c not in checkpoints or checkpoints[c] < t for c, t in panel["checkpoints"].items()):
+            panel = self._empty()
+        if panel["checkpoints"] != checkpoints:
+            # the last klines of each pair could have been stored before their close time, read them again
+            start = min([panel["checkpoints"].get(c, 0) for c in checkpoints]) if len(panel["open_time"]) > 0 else 0
+            panel = self._append(interval_name, panel, pairs, start)
+            panel["checkpoints"] = checkpoints
+            if self.cache_dir is not None:
+                self._save(interval_name, panel)
+        self._panels[interval_name] = panel
+        return dict(panel["fields"], open_time=panel["open_time"], currencies=self.currencies)
+
+    def _append(self, interval_name:str, panel:dict, pairs:dict, start:int) -> dict:
+        """Read the klines of the pairs from the start open time in one ordered pass of the
+        (currency_id, currency_interval_id, open_time) index and scatter them into the matrices"""
+        if len(pairs) == 0:
+            return panel
+        column_of = {p["currency_id"]:self.currencies.index(c) for c, p in pairs.items()}
+        currency_ids = list(column_of.keys())
+        interval_ids = [p["id"] for p in pairs.values()]
+        lookup = np.full(max(currency_ids) + 1, -1, dtype=np.int64)
+        lookup[currency_ids] = list(column_of.values())
+        query = '''SELECT currency_id, open_time, {fields} FROM klines
+            WHERE currency_id IN ({currencies}) AND currency_interval_id IN ({intervals}) AND open_time >= ?
+            ORDER BY currency_id, currency_interval_id, open_time;'''.format(fields=",".join(self.fields),
+                currencies=",".join(["?"]*len(currency_ids)), intervals=",".join(["?"]*len(interval_ids)))
+        kept = int(np.searchsorted(panel["open_time"], start))
+        with METRICS.timer("panel.read"), self.db_conn.reading() as db_conn:
+            # the grid goes from the first cached row (or the first stored kline) to the last checkpoint
+            if kept > 0:
+                first_time = int(panel["open_time"][0])
+            else:
+                # a pair with a checkpoint could have no klines, its MIN is NULL
+                first_times = [db_conn.execute("SELECT MIN(open_time) FROM klines WHERE currency_id = ? AND currency_interval_id = ?;",
+                    (p["currency_id"], p["id"])).fetchone()[0] for p in pairs.values()]
+                first_times = [t for t in first_times if t is not None]
+                if len(first_times) == 0:
+                    return panel
+                first_time = min(first_times)
+            first_slot, last_slot = interval_slots([first_time, max(p["last_transaction_date"] for p in pairs.values())], interval_name)
+            last_slot = max(last_slot, first_slot + kept - 1)
+            size = int(last_slot - first_slot + 1)
+            fields = {}
+            for f, matrix in panel["fields"].items():
+                fields[f] = np.full((size, len(self.currencies)), np.nan)
+                fields[f][:kept] = matrix[:kept]
+            cursor = db_conn.execute(query, currency_ids + interval_ids + [start])
+            klines = 0
+            while True:
+                rows = cursor.fetchmany(Connection.KLINE_CHUNK_SIZE)
+                if len(rows) == 0:
+                    break
+                block = np.array(rows, dtype=np.float64)
+                positions = interval_slots(block[:, 1].astype(np.int64), interval_name) - first_slot
+                columns = lookup[block[:, 0].astype(np.int64)]
+                for i, f in enumerate(self.fields):
+                    fields[f][positions, columns] = block[:, 2 + i]
+                klines += len(block)
+        logger.debug("Panel rows appended", extra={"interval": interval_name, "rows": size - kept, "klines": klines})
+        return {"open_time": slot_open_times(np.arange(first_slot, last_slot + 1), interval_name),
+            "checkpoints": panel["checkpoints"], "fields": fields}
+
+    def frame(self, interval_name:str, field:str="close", full:bool=False):
+        """The panel of a field as a DataFrame indexed by open_time with a column by currency"""
+        import pandas as pd
+        from .utils import timestamps2datetime
+        panel = self.build(interval_name, full)
+        return pd.DataFrame(panel[field], columns=self.currencies,
+            index=pd.DatetimeIndex(timestamps2datetime(panel["open_time"], unit="s"), name="open_time"))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline replay exchange client with deterministic synthetic klines
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import time
+import zlib
+import threading
+import numpy as np
+from .rollup import bucket_open_times
+from .utils import KLINE_INTERVAL_SECONDS
+
+class ReplayClient:
+    """Local stand-in of the binance.Client klines endpoints. Every (symbol, interval) serves
+    a fixed number of synthetic klines, the same values on each run and for any page split,
+    with the shape of the Binance klines (prices as strings, times in milliseconds). The first kline of
+    each interval opens at the interval bucket of the start_time, aligned like the exchange klines
+    (days at midnight UTC, weeks on Monday, see ts.rollup.bucket_open_times)."""
+    API_KEY, API_SECRET = "replay", "replay"
+
+    def __init__(self, rows:int=10000, start_time:int=1502942400000, latency:float=0.0, max_limit:int=1000,
+            seed:int=0) -> None:
+        """
+        :param rows: number of klines of each (symbol, interval)
+        :param start_time: open time in milliseconds of the first kline, floored to each interval bucket
+        :param latency: seconds slept by request, to simulate the network
+        :param max_limit: max klines by request, like the Binance limit
+        :param seed: seed of the synthetic prices
+        """
+        self.rows:int = rows
+        self.start_time:int = start_time
+        self.latency:float = latency
+        self.max_limit:int = max_limit
+        self.seed:int = seed
+        self.requests:int = 0
+        self._lock = threading.Lock()
+
+    def _first_open_time(self, interval:str) -> int:
+        """Open time in milliseconds of the first kline of an interval"""
+        return int(bucket_open_times([self.start_time//1000], interval)[0])*1000
+
+    def _open_times(self, interval:str, index:np.ndarray) -> np.ndarray:
+        """Open time in milliseconds of the klines at the index positions"""
+        if interval == "1M":
+            first = np.datetime64(self.start_time, "ms").astype("datetime64[M]")
+            return (first + index).astype("datetime64[ms]").astype(np.int64)
+        if interval not in KLINE_INTERVAL_SECONDS:
+            raise ValueError("Invalid kline interval '{}'".format(interval))
+        return self._first_open_time(interval) + index*KLINE_INTERVAL_SECONDS[interval]*1000
+
+    def _index(self, interval:str, time_ms:int) -> int:
+        """Position of the first kline with open time at or after time_ms"""
+        if interval == "1M":
+            months = np.datetime64(int(time_ms), "ms").astype("datetime64[M]") \
+                - np.datetime64(self.start_time, "ms").astype("datetime64[M]")
+            index = int(months.astype(np.int64))
+            return index if self._open_times(interval, np.array([index]))[0] >= time_ms else index + 1
+        step = KLINE_INTERVAL_SECONDS[interval]*1000
+        return -(-(int(time_ms) - self._first_open_time(interval))//step)
+
+    def klines(self, symbol:str, interval:str, first:int, last:int) -> list:
+        """Build the synthetic klines between the index positions [first, last)"""
+        first, last = max(0, first), min(self.rows, last)
+        if last <= first:
+            return []
+        index = np.arange(first, last)
+        open_times = self._open_times(interval, index)
+        close_times = self._open_times(interval, index + 1) - 1
+        pair_seed = zlib.crc32("{}:{}:{}".format(symbol, interval, self.seed).encode())
+        base = 10 + pair_seed % 1000
+        # smooth cycles plus a noise that only depends on the position, any page split gives the same values
+        positions = np.arange(first - 1, last)
+        noise = np.sin(positions*12.9898 + pair_seed % 997)*43758.5453
+        noise = noise - np.floor(noise) - 0.5
+        prices = base*(1 + 0.2*np.sin(2*np.pi*positions/10080) + 0.05*np.sin(2*np.pi*positions/1440) + 0.01*noise)
+        open_, close, noise = prices[:-1], prices[1:], noise[1:]
+        spread = base*0.002*(1.5 + noise)
+        high = np.maximum(open_, close) + spread
+        low = np.minimum(open_, close) - spread
+        volume = 100 + 50*(1 + noise)
+        trades = (volume*3).astype(np.int64)
+        f = "{:.8f}".format
+        return [[int(t), f(o), f(h), f(l), f(c), f(v), int(ct), f(v*c), int(n), f(v/2), f(v*c/2), "0"]
+            for t, o, h, l, c, v, ct, n in zip(open_times, open_, high, low, close, volume, close_times, trades)]
+
+    def get_klines(self, symbol:str, interval:str, startTime:int=None, endTime:int=None, limit:int=500, **params) -> list:
+        """Same arguments and output as binance.Client.get_klines"""
+        with self._lock:
+            self.requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        limit = min(limit, self.max_limit)
+        first = max(0, self._index(interval, startTime)) if startTime is not None else 0
+        last = first + limit
+        if endTime is not None:
+            last = min(last, self._index(interval, endTime + 1))
+        return self.klines(symbol, interval, first, last)
+
+    def get_historical_klines(self, symbol:str, interval:str, start_str=None, end_str=None, limit:int=1000, **params) -> list:
+        """Same output as binance.Client.get_historical_klines, the start and end are milliseconds"""
+        klines, start_time = [], start_str if start_str is not None else 0
+        while True:
+            page = self.get_klines(symbol, interval, startTime=start_time, endTime=end_str, limit=limit)
+            klines += page
+            if len(page) < min(limit, self.max_limit):
+                return klines
+            start_time = page[-1][0] + 1
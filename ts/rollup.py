@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Roll-up of the stored 1m klines into the higher intervals
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+from sqlite3 import Row
+import numpy as np
+from .db import Connection, KLINE_VALUE_COLUMNS, KLINE_DTYPES
+from .utils import KLINE_INTERVAL_SECONDS
+
+ROLLUP_SOURCE_INTERVAL = "1m"
+# The weeks start on Monday, 1970-01-05 is the first Monday after the epoch
+WEEK_OFFSET = 4*86400
+
+def bucket_open_times(open_times:np.ndarray, interval_name:str) -> np.ndarray:
+    """Open time (epoch seconds) of the interval bucket of each open time. The buckets are
+    aligned to the epoch, the weeks start on Monday and the months on the first day."""
+    open_times = np.asarray(open_times, dtype=np.int64)
+    if interval_name == "1M":
+        return open_times.astype("datetime64[s]").astype("datetime64[M]").astype("datetime64[s]").astype(np.int64)
+    if interval_name not in KLINE_INTERVAL_SECONDS:
+        raise ValueError("Invalid kline interval '{}'".format(interval_name))
+    length = KLINE_INTERVAL_SECONDS[interval_name]
+    offset = WEEK_OFFSET if interval_name == "1w" else 0
+    return (open_times - offset)//length*length + offset
+
+def next_bucket_open_times(bucket_open:np.ndarray, interval_name:str) -> np.ndarray:
+    """Open time (epoch seconds) of the bucket following each bucket"""
+    bucket_open = np.asarray(bucket_open, dtype=np.int64)
+    if interval_name == "1M":
+        months = bucket_open.astype("datetime64[s]").astype("datetime64[M]") + 1
+        return months.astype("datetime64[s]").astype(np.int64)
+    return bucket_open + KLINE_INTERVAL_SECONDS[interval_name]
+
+def aggregate_klines(arrays:dict, interval_name:str) -> dict:
+    """Aggregate sorted klines into interval buckets: first open, max high, min low, last close
+    and the sum of the volumes and trades, in one vectorized pass
+    :param arrays: dictionary with the NumPy column of each KLINE_VALUE_COLUMNS, sorted by open_time
+    :param interval_name: the target interval
+    :return: dictionary with the NumPy columns of the aggregated klines
+    """
+    if len(arrays["open_time"]) == 0:
+        return {c:np.empty(0, dtype=KLINE_DTYPES[c]) for c in KLINE_VALUE_COLUMNS}
+    buckets = bucket_open_times(arrays["open_time"], interval_name)
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.concatenate([starts[1:], [len(buckets)]]) - 1
+    result = {
+        "open_time": buckets[starts],
+        "open": arrays["open"][starts],
+        "high": np.maximum.reduceat(arrays["high"], starts),
+        "low": np.minimum.reduceat(arrays["low"], starts),
+        "close": arrays["close"][ends],
+        "close_time": next_bucket_open_times(buckets[starts], interval_name),
+    }
+    for c in ["volume", "quote_asset_volume", "trades_count", "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume"]:
+        result[c] = np.add.reduceat(arrays[c], starts)
+    return {c:result[c].astype(KLINE_DTYPES[c], copy=False) for c in KLINE_VALUE_COLUMNS}
+
+def rollup_interval(db_conn:Connection, currency_name:str, source_interval:Row, target_interval:Row,
+        chunk_size:int=Connection.KLINE_CHUNK_SIZE) -> int:
+    """Build the target interval klines of a currency from its stored source interval klines. Only the
+    buckets from the target checkpoint are computed again (the last stored bucket could be incomplete),
+    each chunk is stored with its checkpoint in one transaction.
+    :param db_conn: the DB connection
+    :param currency_name: the currency name, e.g. BTC
+    :param source_interval: the currency interval row of the source, usually 1m
+    :param target_interval: the currency interval row to build
+    :param chunk_size: max source klines in memory
+    :return: the number of target klines stored
+    """
+    target_interval = db_conn.get_currency_interval(target_interval["currency_id"], target_interval["id"], pk_column="id", cached=False)
+    start = target_interval["last_transaction_date"] if target_interval["last_transaction_date"] > 0 else None
+    total = 0
+    carry = None
+    for chunk in db_conn.iter_kline_arrays(currency_name, source_interval["name"], start=start, chunk_size=chunk_size):
+        if carry is not None:
+            chunk = {c:np.concatenate([carry[c], chunk[c]]) for c in KLINE_VALUE_COLUMNS}
+        # the last bucket could continue in the next chunk
+        buckets = bucket_open_times(chunk["open_time"], target_interval["name"])
+        split = int(np.searchsorted(buckets, buckets[-1]))
+        carry = {c:v[split:] for c, v in chunk.items()}
+        total += _store_buckets(db_conn, target_interval, {c:v[:split] for c, v in chunk.items()})
+    if carry is not None:
+        total += _store_buckets(db_conn, target_interval, carry)
+    return total
+
+def _store_buckets(db_conn:Connection, target_interval:Row, arrays:dict) -> int:
+    """Aggregate and upsert the klines of complete buckets"""
+    klines = aggregate_klines(arrays, target_interval["name"])
+    if len(klines["open_time"]) == 0:
+        return 0
+    rows = list(zip(*[klines[c].tolist() for c in KLINE_VALUE_COLUMNS]))
+    stored, _ = db_conn.insert_klines(target_interval["currency_id"], target_interval["id"], target_interval["name"],
+        rows, on_conflict="replace", checkpoint=True)
+    return stored
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent klines sync scheduler
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .metrics import METRICS
+
+class TokenBucket:
+    """Thread safe token bucket rate limiter. Each request acquires as many tokens
+    as its weight, the bucket refills at a constant rate up to its capacity."""
+    def __init__(self, rate:float, capacity:float=None) -> None:
+        """
+        :param rate: tokens added per second
+        :param capacity: max tokens available for a burst, default to one second of tokens
+        """
+        if rate <= 0:
+            raise ValueError("The token bucket rate must be positive")
+        self.rate:float = rate
+        self.capacity:float = capacity if capacity is not None else rate
+        self._tokens:float = self.capacity
+        self._last:float = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, weight_per_minute:int, burst_fraction:float=0.1):
+        """Build a bucket from a per minute weight limit, like the Binance REQUEST_WEIGHT limit"""
+        return cls(weight_per_minute/60, capacity=max(1, weight_per_minute*burst_fraction))
+
+    def acquire(self, tokens:float=1) -> float:
+        """Block until the tokens are available
+        :param tokens: the weight of the request
+        :return: the seconds waited
+        """
+        if tokens > self.capacity:
+            raise ValueError("Requested {} tokens exceeds the bucket capacity {}".format(tokens, self.capacity))
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last)*self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens)/self.rate
+            time.sleep(wait)
+            waited += wait
+
+class SyncScheduler:
+    """Fetch the klines of many (currency, interval) pairs with a pool of threads.
+    The downloaded pages go through a bounded queue to a single writer, the calling
+    thread, which owns the SQLite connection (SQLite allows one writer at a time)."""
+    PAGE, DONE, ERROR = "page", "done", "error"
+
+    def __init__(self, exchange, workers:int=4, rate_limiter:TokenBucket=None, queue_size:int=32,
+            batch_size:int=1000) -> None:
+        """
+        :param exchange: the ts.exchangers.Exchange used to fetch and store the klines
+        :param workers: number of download threads
+        :param rate_limiter: shared rate limiter for the exchange requests
+        :param queue_size: max pages waiting to be written, the downloads block when it is full
+        :param batch_size: klines by request (page), each page is stored in one transaction
+        """
+        self.exchange = exchange
+        self.workers:int = max(1, workers)
+        self.rate_limiter:TokenBucket = rate_limiter
+        self.batch_size:int = batch_size
+        self._queue:queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._failed:set = set()
+
+    def _put(self, item:tuple) -> bool:
+        """Put an item into the queue unless the scheduler is stopped"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch(self, task:dict) -> None:
+        """Worker: download the klines pages of a task and send them to the writer"""
+        key = task["key"]
+        try:
+            for rows in self.exchange.iter_kline_rows(task["currency_interval"], task["symbol"],
+                    limit=self.batch_size, rate_limiter=self.rate_limiter):
+                # a failed insert stops the download, the writer still needs the DONE of the task
+                if key in self._failed:
+                    break
+                if not self._put((self.PAGE, key, rows)):
+                    return
+            self._put((self.DONE, key, None))
+        except Exception as e:
+            self._put((self.ERROR, key, "{}: {}".format(type(e).__name__, e)))
+
+    def run(self, tasks:list) -> dict:
+        """Run the tasks and write their klines as they arrive
+        :param tasks: list of dictionaries with key, symbol and currency_interval
+        :return: summary dictionary by task key with status, klines, error and seconds
+        """
+        summary = {task["key"]:{"status":"pending", "klines":0, "error":None, "seconds":0.0} for task in tasks}
+        state = {task["key"]:{"task":task, "start":time.monotonic()} for task in tasks}
+        pending = len(tasks)
+        self._stop.clear()
+        self._failed.clear()
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kline-sync")
+        try:
+            for task in tasks:
+                pool.submit(self._fetch, task)
+            while pending > 0:
+                kind, key, payload = self._queue.get()
+                task = state[key]["task"]
+                if kind == self.PAGE:
+                    if key in self._failed:
+                        continue
+                    # the page and its checkpoint are stored in one transaction
+                    stored, last_open_time = self.exchange.store_kline_rows(task["currency_interval"], payload)
+                    if last_open_time == 0:
+                        self._failed.add(key)
+                        summary[key]["error"] = "Failed insert the klines batch from '{}'".format(payload[0][0])
+                        continue
+                    summary[key]["klines"] += self.exchange.new_kline_count(task["currency_interval"], payload, stored)
+                    continue
+                pending -= 1
+                if kind == self.ERROR:
+                    self._failed.add(key)
+                    summary[key]["error"] = payload
+                summary[key]["status"] = "failed" if key in self._failed else "ok"
+                summary[key]["seconds"] = time.monotonic() - state[key]["start"]
+                METRICS.rows((task["symbol"], task["currency_interval"]["name"]), summary[key]["klines"], summary[key]["seconds"])
+        finally:
+            self._stop.set()
+            pool.shutdown(wait=True)
+        return summary
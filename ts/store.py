@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar klines store partitioned by month (.npy or Parquet files)
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import os
+import json
+import numpy as np
+from .db import Connection, KLINE_VALUE_COLUMNS, KLINE_DTYPES, kline_arrays2frame
+from .metrics import get_logger
+
+STORE_FORMATS = ["npy", "parquet"]
+MANIFEST_FILE = "manifest.json"
+
+logger = get_logger("store")
+
+def month_keys(open_times:np.ndarray) -> np.ndarray:
+    """The month partition key (YYYY-MM) of each open time in epoch seconds"""
+    return np.asarray(open_times, dtype=np.int64).astype("datetime64[s]").astype("datetime64[M]").astype(str)
+
+def _time2seconds(t) -> int:
+    """Epoch seconds of a datetime or epoch seconds value"""
+    return int(t.timestamp()) if hasattr(t, "timestamp") else t
+
+class KlineStore:
+    """Klines of each (currency, interval) exported as one file by column and month:
+    {root}/{currency}/{interval}/{YYYY-MM}/{column}.npy plus a manifest.json by pair.
+    The .npy partitions are loaded memory-mapped, without copies."""
+    def __init__(self, root:str) -> None:
+        """
+        :param root: the directory of the store
+        """
+        self.root:str = root
+
+    def pair_dir(self, currency_name:str, interval_name:str) -> str:
+        return os.path.join(self.root, currency_name, interval_name)
+
+    def read_manifest(self, currency_name:str, interval_name:str) -> dict:
+        """The manifest of a pair, an empty manifest if the pair was never exported"""
+        manifest_file = os.path.join(self.pair_dir(currency_name, interval_name), MANIFEST_FILE)
+        if not os.path.isfile(manifest_file):
+            return {"currency": currency_name, "interval": interval_name, "last_transaction_date": 0,
+                "format": None, "columns": {c:np.dtype(KLINE_DTYPES[c]).str for c in KLINE_VALUE_COLUMNS},
+                "partitions": {}}
+        with open(manifest_file) as file:
+            return json.load(file)
+
+    def _write_manifest(self, manifest:dict) -> None:
+        pair_dir = self.pair_dir(manifest["currency"], manifest["interval"])
+        tmp_file = os.path.join(pair_dir, MANIFEST_FILE + ".tmp")
+        with open(tmp_file, "w") as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+        os.replace(tmp_file, os.path.join(pair_dir, MANIFEST_FILE))
+
+    def _write_partition(self, manifest:dict, month:str, arrays:dict, store_format:str) -> None:
+        """Write the column files of a month, each file replaced atomically"""
+        partition_dir = os.path.join(self.pair_dir(manifest["currency"], manifest["interval"]), month)
+        os.makedirs(partition_dir, exist_ok=True)
+        for c in KLINE_VALUE_COLUMNS:
+            column_file = os.path.join(partition_dir, "{}.{}".format(c, store_format))
+            tmp_file = column_file + ".tmp"
+            if store_format == "npy":
+                with open(tmp_file, "wb") as file:
+                    np.save(file, arrays[c])
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                pq.write_table(pa.table({c:arrays[c]}), tmp_file)
+            os.replace(tmp_file, column_file)
+        manifest["partitions"][month] = {
+            "rows": int(len(arrays["open_time"])),
+            "first_open_time": int(arrays["open_time"][0]),
+            "last_open_time": int(arrays["open_time"][-1])
+        }
+
+    def export(self, db_conn:Connection, currency_name:str, interval_name:str, store_format:str="npy") -> int:
+        """Export the klines of a pair from the DB. Only the months from the last exported
+        partition are written again, nothing is done if the pair last_transaction_date did not change.
+        :param store_format: 'npy' or 'parquet' (requires pyarrow)
+        :return: the number of partitions written
+        """
+        if store_format not in STORE_FORMATS:
+            raise ValueError("Invalid store format '{}', expected one of: {}".format(store_format, ", ".join(STORE_FORMATS)))
+        currency = db_conn.get_currency(currency_name)
+        # the checkpoint drives the incremental export, read it from the DB
+        currency_interval = db_conn.get_currency_interval(currency["id"], interval_name, cached=False) \
+            if currency is not None else None
+        if currency_interval is None:
+            return 0
+        manifest = self.read_manifest(currency_name, interval_name)
+        if manifest["format"] is not None and manifest["format"] != store_format:
+            # a different format, export the whole pair again
+            manifest["partitions"], manifest["last_transaction_date"] = {}, 0
+        if manifest["last_transaction_date"] == currency_interval["last_transaction_date"] and len(manifest["partitions"]) > 0:
+            return 0
+        manifest["format"] = store_format
+        start = None
+        if len(manifest["partitions"]) > 0:
+            # the last exported month could be incomplete
+            start = manifest["partitions"][max(manifest["partitions"])]["first_open_time"]
+        written = 0
+        month, pending = None, []
+        for chunk in db_conn.iter_kline_arrays(currency_name, interval_name, start=start):
+            keys = month_keys(chunk["open_time"])
+            bounds = np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1, [len(keys)]])
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                if month is not None and keys[lo] != month:
+                    self._write_partition(manifest, month,
+                        {c:np.concatenate([p[c] for p in pending]) for c in KLINE_VALUE_COLUMNS}, store_format)
+                    written += 1
+                    pending = []
+                month = keys[lo]
+                pending.append({c:v[lo:hi] for c, v in chunk.items()})
+        if len(pending) > 0:
+            self._write_partition(manifest, month,
+                {c:np.concatenate([p[c] for p in pending]) for c in KLINE_VALUE_COLUMNS}, store_format)
+            written += 1
+        manifest["last_transaction_date"] = currency_interval["last_transaction_date"]
+        os.makedirs(self.pair_dir(currency_name, interval_name), exist_ok=True)
+        self._write_manifest(manifest)
+        if written > 0:
+            logger.info("Pair exported", extra={"currency": currency_name, "interval": interval_name, "partitions": written})
+        return written
+
+    def export_all(self, db_conn:Connection, pairs:list, store_format:str="npy") -> dict:
+        """Export many (currency, interval) pairs
+        :return: the number of partitions written by pair
+        """
+        return {(c, i):self.export(db_conn, c, i, store_format) for c, i in pairs}
+
+    def iter_partitions(self, currency_name:str, interval_name:str, start=None, end=None):
+        """Iterate the month partitions overlapping the time range, without reading the other months
+        :param start: the first open_time, epoch seconds or datetime (None from the beginning)
+        :param end: the last open_time included, epoch seconds or datetime (None up to the end)
+        :return: generator of dictionaries with the column arrays of a month (memory-mapped for .npy)
+        """
+        manifest = self.read_manifest(currency_name, interval_name)
+        start, end = _time2seconds(start), _time2seconds(end)
+        pair_dir = self.pair_dir(currency_name, interval_name)
+        for month in sorted(manifest["partitions"]):
+            partition = manifest["partitions"][month]
+            if (start is not None and partition["last_open_time"] < start) or \
+                    (end is not None and partition["first_open_time"] > end):
+                continue
+            arrays = {}
+            for c in KLINE_VALUE_COLUMNS:
+                column_file = os.path.join(pair_dir, month, "{}.{}".format(c, manifest["format"]))
+                if manifest["format"] == "npy":
+                    arrays[c] = np.load(column_file, mmap_mode="r")
+                else:
+                    import pyarrow.parquet as pq
+                    arrays[c] = pq.read_table(column_file, memory_map=True).column(c).to_numpy()
+            # trim the partitions on the range edges, the slices are still views
+            lo = int(np.searchsorted(arrays["open_time"], start, side="left")) if start is not None else 0
+            hi = int(np.searchsorted(arrays["open_time"], end, side="right")) if end is not None else partition["rows"]
+            yield {c:v[lo:hi] for c, v in arrays.items()}
+
+    def load(self, currency_name:str, interval_name:str, start=None, end=None, as_frame:bool=True):
+        """Load the klines of a time range, a single month keeps the memory-mapped views
+        :return: DataFrame indexed by open_time or dictionary of column arrays
+        """
+        partitions = list(self.iter_partitions(currency_name, interval_name, start, end))
+        if len(partitions) == 0:
+            arrays = {c:np.empty(0, dtype=KLINE_DTYPES[c]) for c in KLINE_VALUE_COLUMNS}
+        elif len(partitions) == 1:
+            arrays = partitions[0]
+        else:
+            arrays = {c:np.concatenate([p[c] for p in partitions]) for c in KLINE_VALUE_COLUMNS}
+        return kline_arrays2frame(arrays) if as_frame else arrays
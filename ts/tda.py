@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sliding window delay embeddings and topological features for TDA forecasting
+@datecreated: 2026-10-18
+@lastupdated: 2026-10-18
+@author: Jose Luis Bracamonte Amavizca
+"""
+# Meta information.
+__author__ = 'Jose Luis Bracamonte Amavizca'
+__version__ = '0.0.1'
+__maintainer__ = 'Jose Luis Bracamonte Amavizca'
+__email__ = 'luisjba@gmail.com'
+__status__ = 'Development'
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+
+TDA_FEATURES = ["h0_total", "h0_max", "h0_l2", "h0_entropy", "diameter", "mean_distance"]
+
+def delay_embedding(series:np.ndarray, dim:int, lag:int=1) -> np.ndarray:
+    """Takens delay embedding of a series as a zero-copy view, row i is
+    (x[i], x[i + lag], ..., x[i + (dim - 1)*lag])
+    :return: 2-D view (len(series) - (dim - 1)*lag, dim)
+    """
+    series = np.asarray(series, dtype=np.float64)
+    span = (dim - 1)*lag + 1
+    if dim < 1 or lag < 1:
+        raise ValueError("The embedding dim and lag must be positive")
+    if len(series) < span:
+        return np.empty((0, dim), dtype=np.float64)
+    return sliding_window_view(series, span)[:, ::lag]
+
+def window_point_clouds(series:np.ndarray, window:int, dim:int, lag:int=1, step:int=1) -> np.ndarray:
+    """Point clouds of every sliding window of the delay embedding as a zero-copy view,
+    the cloud k holds the embedded points k*step ... k*step + window - 1
+    :param window: points by cloud
+    :param step: embedded points between consecutive windows
+    :return: 3-D view (windows, window, dim)
+    """
+    embedding = delay_embedding(series, dim, lag)
+    if len(embedding) < window:
+        return np.empty((0, window, dim), dtype=np.float64)
+    # sliding_window_view appends the window axis last: (windows, dim, window)
+    return sliding_window_view(embedding, window, axis=0)[::step].transpose(0, 2, 1)
+
+def window_count(length:int, window:int, dim:int, lag:int=1, step:int=1) -> int:
+    """Number of windows of a series length"""
+    points = length - (dim - 1)*lag
+    return max(0, (points - window)//step + 1) if points >= window else 0
+
+def h0_persistence(clouds:np.ndarray) -> tuple:
+    """H0 persistence of a batch of point clouds. Under the Vietoris-Rips filtration every point
+    is born at 0 and the components die at the edge lengths of the minimum spanning tree, built
+    with Prim's algorithm vectorized across the batch.
+    :param clouds: 3-D array (batch, points, dim)
+    :return: tuple with the death times (batch, points - 1) and the distance matrices (batch, points, points)
+    """
+    clouds = np.asarray(clouds, dtype=np.float64)
+    batch, points = clouds.shape[0], clouds.shape[1]
+    squared = np.einsum("bij,bij->bi", clouds, clouds)
+    distances = squared[:, :, None] + squared[:, None, :] - 2*np.einsum("bid,bjd->bij", clouds, clouds)
+    distances = np.sqrt(np.maximum(distances, 0.0))
+    deaths = np.empty((batch, max(0, points - 1)), dtype=np.float64)
+    rows = np.arange(batch)
+    in_tree = np.zeros((batch, points), dtype=bool)
+    in_tree[:, 0] = True
+    nearest = distances[:, 0].copy()
+    for k in range(points - 1):
+        candidates = np.where(in_tree, np.inf, nearest)
+        nxt = np.argmin(candidates, axis=1)
+        deaths[:, k] = candidates[rows, nxt]
+        in_tree[rows, nxt] = True
+        np.minimum(nearest, distances[rows, nxt], out=nearest)
+    return deaths, distances
+
+def topological_summary(clouds:np.ndarray, normalize:bool=True) -> np.ndarray:
+    """Topological features of a batch of point clouds, see TDA_FEATURES: the total, max and L2 norm
+    of the H0 persistence, its entropy and the diameter and mean of the distance matrix (cheap proxies)
+    :param normalize: z-score each cloud so the features describe the shape, not the price level
+    :return: 2-D array (batch, len(TDA_FEATURES))
+    """
+    clouds = np.asarray(clouds, dtype=np.float64)
+    if normalize:
+        center = clouds.mean(axis=1, keepdims=True)
+        scale = clouds.std(axis=(1, 2), keepdims=True)
+        clouds = (clouds - center)/np.where(scale > 0, scale, 1.0)
+    deaths, distances = h0_persistence(clouds)
+    points = clouds.shape[1]
+    total = deaths.sum(axis=1)
+    p = deaths/np.where(total > 0, total, 1.0)[:, None]
+    entropy = -np.sum(np.where(p > 0, p*np.log(np.where(p > 0, p, 1.0)), 0.0), axis=1)
+    pairs = max(1, points*(points - 1))
+    return np.column_stack([
+        total,
+        deaths.max(axis=1) if deaths.shape[1] > 0 else np.zeros(len(clouds)),
+        np.sqrt(np.sum(deaths**2, axis=1)),
+        entropy,
+        distances.max(axis=(1, 2)),
+        distances.sum(axis=(1, 2))/pairs
+    ])
+
+def _features_batch(segment:np.ndarray, window:int, dim:int, lag:int, step:int, normalize:bool) -> np.ndarray:
+    """Process pool task: the features of the windows of a series segment"""
+    return topological_summary(window_point_clouds(segment, window, dim, lag, step), normalize)
+
+def topological_features(series:np.ndarray, window:int, dim:int, lag:int=1, step:int=1, normalize:bool=True,
+        batch_size:int=512, processes:int=None) -> np.ndarray:
+    """Topological features of every sliding window of the delay embedding of a series. The windows
+    are split in batches, each batch sends only its series segment to a process pool.
+    :param series: 1-D array, e.g. the close prices or the log returns
+    :param window: embedded points by window
+    :param dim: embedding dimension
+    :param lag: embedding delay in samples
+    :param step: embedded points between consecutive windows
+    :param batch_size: windows by batch, bounds the (batch, window, window) distance matrices
+    :param processes: number of processes, None uses the CPU count and 1 runs in this process
+    :return: 2-D array (windows, len(TDA_FEATURES)), the row k belongs to the window ending at the
+        series position k*step + window - 1 + (dim - 1)*lag
+    """
+    series = np.asarray(series, dtype=np.float64)
+    total = window_count(len(series), window, dim, lag, step)
+    if total == 0:
+        return np.empty((0, len(TDA_FEATURES)), dtype=np.float64)
+    span = window - 1 + (dim - 1)*lag + 1
+    args = []
+    for first in range(0, total, batch_size):
+        last = min(total, first + batch_size)
+        args.append((series[first*step:(last - 1)*step + span], window, dim, lag, step, normalize))
+    if processes == 1 or len(args) <= 1:
+        results = [_features_batch(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_features_batch, *zip(*args)))
+    return np.concatenate(results)
+
+class TopologicalFeatureCache:
+    """Topological features stored by (currency, interval, window, dim, lag) in
+    {root}/{currency}/{interval}/w{window}_d{dim}_l{lag}.npz with the open time of each window end.
+    A run only computes the windows ending after the last cached one."""
+    def __init__(self, root:str, normalize:bool=True) -> None:
+        """
+        :param root: the directory of the cache
+        :param normalize: z-score each window cloud, see topological_summary
+        """
+        self.root:str = root
+        self.normalize:bool = normalize
+
+    def path(self, currency_name:str, interval_name:str, window:int, dim:int, lag:int) -> str:
+        return os.path.join(self.root, currency_name, interval_name,
+            "w{}_d{}_l{}{}.npz".format(window, dim, lag, "" if self.normalize else "_raw"))
+
+    def load(self, currency_name:str, interval_name:str, window:int, dim:int, lag:int) -> tuple:
+        """The cached features
+        :return: tuple with the window end open times and the features array
+        """
+        path = self.path(currency_name, interval_name, window, dim, lag)
+        if not os.path.isfile(path):
+            return np.empty(0, dtype=np.int64), np.empty((0, len(TDA_FEATURES)), dtype=np.float64)
+        with np.load(path) as data:
+            return data["open_time"], data["features"]
+
+    def features(self, currency_name:str, interval_name:str, series:np.ndarray, open_times:np.ndarray,
+            window:int, dim:int, lag:int=1, batch_size:int=512, processes:int=None) -> tuple:
+        """The features of every window of the series, computing only the windows not cached
+        :param series: 1-D array, e.g. the close prices
+        :param open_times: the open time of each series value, sorted
+        :return: tuple with the window end open times and the features array
+        """
+        series = np.asarray(series, dtype=np.float64)
+        open_times = np.asarray(open_times, dtype=np.int64)
+        offset = window - 1 + (dim - 1)*lag
+        cached_times, cached = self.load(currency_name, interval_name, window, dim, lag)
+        first = 0
+        if len(cached_times) > 0:
+            # the cache is only extended if it matches the series, otherwise it is built again
+            position = int(np.searchsorted(open_times, cached_times[-1]))
+            if position < len(open_times) and open_times[position] == cached_times[-1] \
+                    and position - offset == len(cached_times) - 1:
+                first = len(cached_times)
+            else:
+                cached_times, cached = cached_times[:0], cached[:0]
+        new = topological_features(series[first:], window, dim, lag, 1, self.normalize, batch_size, processes)
+        if len(new) == 0:
+            return cached_times, cached
+        cached_times = np.concatenate([cached_times, open_times[first + offset:]])
+        cached = np.concatenate([cached, new])
+        path = self.path(currency_name, interval_name, window, dim, lag)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "wb") as file:
+            np.savez(file, open_time=cached_times, features=cached)
+        os.replace(tmp_file, path)
+        return cached_times, cached
+
+    def features_from_db(self, db_conn, currency_name:str, interval_name:str, window:int, dim:int, lag:int=1,
+            column:str="close", batch_size:int=512, processes:int=None):
+        """The cached features of a kline column of a stored pair
+        :param db_conn: the ts.db.Connection
+        :param column: the kline column embedded, e.g. close
+        :return: DataFrame of the TDA_FEATURES indexed by the window end open_time
+        """
+        import pandas as pd
+        from .utils import timestamps2datetime
+        arrays = db_conn.read_kline_arrays(currency_name, interval_name)
+        times, features = self.features(currency_name, interval_name, arrays[column], arrays["open_time"],
+            window, dim, lag, batch_size, processes)
+        return pd.DataFrame(features, columns=TDA_FEATURES,
+            index=pd.DatetimeIndex(timestamps2datetime(times, unit="s"), name="open_time"))
@@ -15,6 +15,27 @@ __status__ = 'Development'
 
 import datetime
 
+# Fixed length in seconds of the Binance kline intervals, the month (1M) length varies
+KLINE_INTERVAL_SECONDS = {
+    "1m": 60,
+    "3m": 3*60,
+    "5m": 5*60,
+    "15m": 15*60,
+    "30m": 30*60,
+    "1h": 3600,
+    "2h": 2*3600,
+    "4h": 4*3600,
+    "6h": 6*3600,
+    "8h": 8*3600,
+    "12h": 12*3600,
+    "1d": 86400,
+    "3d": 3*86400,
+    "1w": 7*86400,
+}
+
+class TSError(Exception):
+    """Error of the ts library, the callers (e.g. the CLI) decide how to report it"""
+
 class bcolors:
     HEADER = '\033[95m'
     OKBLUE = '\033[94m'
@@ -59,4 +80,21 @@ def timestamp2datetime(time_stamp:int, tz_hour_dif:int=-7) -> datetime.datetime:
     elif tz_hour_dif < 0:
         return dt - delta_hour
     else:
-        return dt + delta_hour
\ No newline at end of file
+        return dt + delta_hour
+
+def timestamps2datetime(time_stamps, tz=None, unit:str="ms"):
+    """Vectorized timestamp2datetime, converts all the timestamps in one pass
+    :param time_stamps: NumPy array, pandas Series or list of epoch timestamps
+    :param tz: None for UTC naive values, an IANA time zone name (e.g. 'America/Hermosillo'),
+        a fixed offset in hours (e.g. -7) or a datetime.tzinfo
+    :param unit: 'ms' for epoch milliseconds (Binance) or 's' for epoch seconds (DB)
+    :return: datetime64[ms] array when tz is None, otherwise a tz-aware pandas DatetimeIndex
+    """
+    import numpy as np
+    values = np.asarray(time_stamps, dtype=np.int64).astype("datetime64[{}]".format(unit)).astype("datetime64[ms]")
+    if tz is None:
+        return values
+    import pandas as pd
+    if isinstance(tz, (int, float)):
+        tz = datetime.timezone(datetime.timedelta(hours=tz))
+    return pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(tz)